@@ -0,0 +1,110 @@
+"""Catalog-wide sales analytics: velocity, top sellers and reorder suggestions.
+
+forecast() reads the catalog and the trailing windows of the sales_daily
+rollup in fetchmany batches into flat arrays indexed by catalog position.
+It then computes every product's figures in one pass, instead of running a
+query per product. The rollup keeps archived days, so no archive partition
+is attached.
+
+Each window sum is built in two steps. Every rollup row is added once into
+the bucket of the smallest window containing its day. The buckets are then
+prefix-summed, so adding windows costs no extra work per row.
+
+Demand rate is the larger of the shortest window's daily rate and the
+VELOCITY_WINDOW rate, so a fast mover that is accelerating is not judged by
+its slower month. A product is suggested for reorder once its days of cover
+fall below LEAD_TIME_DAYS + SAFETY_DAYS. The suggested quantity raises stock
+to LEAD_TIME_DAYS + COVER_DAYS of demand.
+"""
+import datetime
+import heapq
+import math
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+from db import get_conn
+
+WINDOWS = (7, 30, 90)  # trailing windows in days, as of the report day
+VELOCITY_WINDOW = 30
+LEAD_TIME_DAYS = 7
+SAFETY_DAYS = 7
+COVER_DAYS = 30
+TOP_N = 10
+REORDER_LIMIT = 500
+FETCH_BATCH = 50000
+
+def _load_catalog(conn):
+    ids, quantities, names, skus = array("q"), array("q"), [], []
+    cur = conn.execute("SELECT id, name, sku, quantity FROM products")
+    while True:
+        rows = cur.fetchmany(FETCH_BATCH)
+        if not rows:
+            break
+        for pid, name, sku, qty in rows:
+            ids.append(pid)
+            quantities.append(qty)
+            names.append(name)
+            skus.append(sku)
+    return ids, quantities, names, skus
+
+def _window_sums(conn, position: Dict[int, int], as_of: datetime.date,
+                 windows: Sequence[int]) -> Tuple[List[array], int]:
+    """Units sold per catalog position in each trailing window; also returns
+    the number of rollup rows read."""
+    n = len(position)
+    # day -> bucket: the index of the smallest window that contains it
+    bucket_of = {}
+    for age in range(windows[-1]):
+        day = (as_of - datetime.timedelta(days=age)).isoformat()
+        bucket_of[day] = next(i for i, w in enumerate(windows) if age < w)
+    buckets = [array("q", [0]) * n for _ in windows]
+    read = 0
+    cur = conn.execute("SELECT day, product_id, qty FROM sales_daily WHERE day > ? AND day <= ?",
+                       ((as_of - datetime.timedelta(days=windows[-1])).isoformat(), as_of.isoformat()))
+    while True:
+        rows = cur.fetchmany(FETCH_BATCH)
+        if not rows:
+            break
+        read += len(rows)
+        for day, pid, qty in rows:
+            pos = position.get(pid)
+            if pos is not None:  # sales of since-deleted products are skipped
+                buckets[bucket_of[day]][pos] += qty
+    for i in range(1, len(buckets)):
+        buckets[i] = array("q", map(int.__add__, buckets[i - 1], buckets[i]))
+    return buckets, read
+
+def forecast(as_of: str = None, windows: Sequence[int] = WINDOWS, top_n: int = TOP_N,
+             reorder_limit: int = REORDER_LIMIT) -> dict:
+    """Velocity, top sellers and reorder suggestions for the whole catalog.
+
+    Returns {"as_of", "products", "rows", "top", "reorder", "reorder_total"}.
+    "top" maps each window to its best sellers as (id, name, sku, units).
+    "reorder" lists (id, name, sku, quantity, units_per_day, days_of_cover,
+    suggested_qty) for the products that need stock, fewest days of cover
+    first, capped at `reorder_limit`; "reorder_total" counts all of them.
+    """
+    day = datetime.date.fromisoformat(as_of) if as_of else datetime.date.today()
+    windows = sorted(set(windows) | {VELOCITY_WINDOW})
+    with get_conn() as conn:
+        ids, quantities, names, skus = _load_catalog(conn)
+        position = {pid: i for i, pid in enumerate(ids)}
+        sums, read = _window_sums(conn, position, day, windows)
+
+    short, long_ = sums[0], sums[windows.index(VELOCITY_WINDOW)]
+    short_days = windows[0]
+    trigger, target = LEAD_TIME_DAYS + SAFETY_DAYS, LEAD_TIME_DAYS + COVER_DAYS
+    suggestions = []
+    for i, (qty, s, l) in enumerate(zip(quantities, short, long_)):
+        rate = max(s / short_days, l / VELOCITY_WINDOW)
+        if rate and qty < rate * trigger:
+            suggestions.append((qty / rate, i, rate, math.ceil(rate * target) - qty))
+    reorder = [(ids[i], names[i], skus[i], quantities[i], round(rate, 2), round(cover, 1), order)
+               for cover, i, rate, order in heapq.nsmallest(reorder_limit, suggestions)]
+
+    top = {}
+    for w, units in zip(windows, sums):
+        best = heapq.nlargest(top_n, range(len(units)), key=units.__getitem__)
+        top[w] = [(ids[i], names[i], skus[i], units[i]) for i in best if units[i] > 0]
+    return {"as_of": day.isoformat(), "products": len(ids), "rows": read, "top": top,
+            "reorder": reorder, "reorder_total": len(suggestions)}
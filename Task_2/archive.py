@@ -0,0 +1,185 @@
+"""Time-partitioned storage for old sales.
+
+Sales older than a horizon move out of the main database into one SQLite file
+per year (or per month) next to it, e.g. inventory_archive/sales_2023.db.
+Readers call sales_union(), which reads main.sales and then ATTACHes only the
+partitions whose period overlaps the requested dates and UNION ALLs them. The
+sales_daily rollup keeps the archived days, so sales_summary() never opens a
+partition at all.
+"""
+import datetime
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import db
+from utils import day_bounds
+
+ARCHIVE_HORIZON_DAYS = 365
+ARCHIVE_GRANULARITY = "year"  # or "month"
+
+_PARTITION_RE = re.compile(r"^sales_(\d{4}(?:-\d{2})?)\.db$")
+_COLUMNS = "id, product_id, quantity, unit_price, total, ts"
+
+def _partition_schema(schema: str) -> List[str]:
+    return [
+        f"""CREATE TABLE IF NOT EXISTS {schema}.sales(
+            id INTEGER PRIMARY KEY,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            total REAL NOT NULL,
+            ts TEXT NOT NULL
+        );""",
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_sales_ts ON sales(ts);",
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_sales_product_ts ON sales(product_id, ts);",
+    ]
+
+def archive_dir() -> Path:
+    return db.DB_PATH.with_name(db.DB_PATH.stem + "_archive")
+
+def _period(key: str) -> Tuple[str, str]:
+    """Half-open [start, end) ISO day range covered by a partition key."""
+    if len(key) == 4:
+        return f"{key}-01-01", f"{int(key) + 1:04d}-01-01"
+    year, month = map(int, key.split("-"))
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{key}-01", f"{year:04d}-{month:02d}-01"
+
+def partitions(date_from: str = None, date_to: str = None) -> List[Tuple[str, Path]]:
+    """(key, path) of the partitions overlapping [date_from, date_to], newest first."""
+    try:
+        names = os.listdir(archive_dir())
+    except FileNotFoundError:
+        return []
+    first, end = day_bounds(date_from, date_to)
+    found = []
+    for name in names:
+        m = _PARTITION_RE.match(name)
+        if not m:
+            continue
+        start, stop = _period(m.group(1))
+        if (first and stop <= first) or (end and start >= end):
+            continue
+        found.append((m.group(1), archive_dir() / name))
+    return sorted(found, reverse=True)
+
+def _attached(conn) -> int:
+    return sum(1 for row in conn.execute("PRAGMA database_list") if row[1] not in ("main", "temp"))
+
+def sales_union(conn, select: str, params=(), date_from: str = None, date_to: str = None,
+                include_main: bool = True) -> Iterator[Tuple[str, list]]:
+    """Yield (sql, params) running `select` over every overlapping sales table.
+
+    `select` names the table as {sales}. The first statement reads main.sales
+    alone, so newest-first readers that fill a page from it never attach a
+    partition; the rest UNION ALL the overlapping partitions, newest first, in
+    batches that fit SQLite's attached-database limit. A batch stays attached
+    only until the next statement is requested, so fetch all rows first.
+    Must not be called inside a transaction (ATTACH is not allowed there).
+    """
+    if include_main:
+        yield select.format(sales="main.sales"), list(params)
+    parts = partitions(date_from, date_to)
+    room = max(1, conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - _attached(conn))
+    for i in range(0, len(parts), room):
+        names = []
+        try:
+            for key, path in parts[i:i + room]:
+                name = "sales_" + key.replace("-", "_")
+                conn.execute(f"ATTACH DATABASE ? AS {name}", (str(path),))
+                names.append(name)
+            yield (" UNION ALL ".join(select.format(sales=f"{n}.sales") for n in names),
+                   list(params) * len(names))
+        finally:
+            for name in names:
+                conn.execute(f"DETACH DATABASE {name}")
+
+def archive_sales(before: str = None, granularity: str = None) -> dict:
+    """Move sales with ts before `before` (default: the horizon) into partitions.
+
+    One transaction per partition copies the rows, deletes them from the main
+    database and restores their sales_daily rows (the delete trigger would
+    otherwise drop them). With WAL the two files don't commit atomically, so
+    the copy uses INSERT OR IGNORE: re-running after a crash finishes the move
+    without duplicating rows.
+    """
+    if before is None:
+        before = (datetime.date.today() - datetime.timedelta(days=ARCHIVE_HORIZON_DAYS)).isoformat()
+    else:
+        before = datetime.date.fromisoformat(before).isoformat()
+    granularity = granularity or ARCHIVE_GRANULARITY
+    if granularity not in ("year", "month"):
+        raise ValueError(f"Unknown granularity: {granularity}")
+    width = 4 if granularity == "year" else 7
+    archive_dir().mkdir(exist_ok=True)
+    moved, touched = 0, []
+    with db.get_conn() as conn:
+        keys = [r[0] for r in conn.execute(
+            f"SELECT DISTINCT substr(ts, 1, {width}) FROM sales WHERE ts < ? ORDER BY 1", (before,))]
+        for key in keys:
+            start, stop = _period(key)
+            stop = min(stop, before)
+            path = archive_dir() / f"sales_{key}.db"
+            conn.execute("ATTACH DATABASE ? AS archive_target", (str(path),))
+            try:
+                for stmt in _partition_schema("archive_target"):
+                    conn.execute(stmt)
+                with db.write_transaction():
+                    conn.execute(f"""INSERT OR IGNORE INTO archive_target.sales({_COLUMNS})
+                                     SELECT {_COLUMNS} FROM main.sales WHERE ts >= ? AND ts < ?""", (start, stop))
+                    conn.execute("""CREATE TEMP TABLE archived_days AS
+                                    SELECT * FROM main.sales_daily WHERE day >= ? AND day < ?""", (start, stop))
+                    moved += conn.execute("DELETE FROM main.sales WHERE ts >= ? AND ts < ?", (start, stop)).rowcount
+                    conn.execute("INSERT OR REPLACE INTO main.sales_daily SELECT * FROM temp.archived_days")
+                    conn.execute("DROP TABLE temp.archived_days")
+            finally:
+                conn.execute("DETACH DATABASE archive_target")
+            touched.append(path.name)
+    return {"before": before, "moved": moved, "partitions": touched}
+
+def purge_product(product_id: int) -> int:
+    """Delete a product's archived sales from every partition; returns rows removed.
+
+    Main sales go with the product through ON DELETE CASCADE, but partitions
+    have no foreign key. Without this, archived history would outlive the
+    product in summaries while listings (which join products) hide it.
+    Idempotent, so a crash part-way is fixed by calling it again.
+    """
+    removed = 0
+    for key, path in partitions():
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                removed += conn.execute("DELETE FROM sales WHERE product_id = ?", (product_id,)).rowcount
+        finally:
+            conn.close()
+    return removed
+
+def compact() -> dict:
+    """VACUUM every partition and then the main database; returns bytes saved.
+
+    Archiving leaves free pages behind in the main file, and partitions that
+    received several runs are fragmented. Needs a quiet moment: VACUUM on the
+    main database waits for, and then blocks, every other writer.
+    """
+    saved = {}
+    for key, path in partitions():
+        size = path.stat().st_size
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        saved[path.name] = size - path.stat().st_size
+    size = db.DB_PATH.stat().st_size
+    conn = db.connect_unpooled()
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    db.checkpoint("TRUNCATE")
+    saved[db.DB_PATH.name] = size - db.DB_PATH.stat().st_size
+    return saved
@@ -1,9 +1,150 @@
-from hashlib import sha256
+from hashlib import sha256, pbkdf2_hmac
+from collections import OrderedDict
+import hashlib
+import os
 import secrets
+import threading
+import time
 from db import get_conn
 from typing import Optional, Tuple
 
+# Stored hashes are "<scheme>$<cost...>$<hex digest>" so the cost can be raised
+# later; bare 64-char hex values are the original salted SHA-256 and are
+# rehashed with the current scheme on the next successful login.
+HASH_SCHEME = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+HASH_BUDGET_MS = float(os.environ.get("INVENTORY_HASH_BUDGET_MS", "100"))
+SCRYPT_R, SCRYPT_P = 8, 1
+SCRYPT_MIN_N, SCRYPT_MAX_N = 2 ** 14, 2 ** 16  # 16 MB .. 64 MB per hash
+PBKDF2_MIN_ITERATIONS = 100000
+
+def _scrypt(password: str, salt: str, n: int, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt.encode("utf-8"), n=n, r=r, p=p,
+                          maxmem=256 * r * n, dklen=32).hex()
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), iterations).hex()
+
+def _time_ms(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn("calibrate", "calibrate", *args)
+    return (time.perf_counter() - t0) * 1000
+
+def _calibrate_scrypt(budget_ms: float) -> Tuple:
+    n = SCRYPT_MIN_N
+    # doubling n doubles the cost, so stop before the next step would overshoot
+    while n < SCRYPT_MAX_N and _time_ms(_scrypt, n) * 2 <= budget_ms:
+        n *= 2
+    return (n, SCRYPT_R, SCRYPT_P)
+
+def _calibrate_pbkdf2(budget_ms: float) -> Tuple:
+    per_10k = _time_ms(_pbkdf2, 10000)
+    return (max(PBKDF2_MIN_ITERATIONS, int(budget_ms / per_10k) * 10000),)
+
+HASHERS = {
+    "scrypt": (_scrypt, _calibrate_scrypt),
+    "pbkdf2_sha256": (_pbkdf2, _calibrate_pbkdf2),
+}
+
+_hash_params = {}
+_calibrate_lock = threading.Lock()
+
+def calibrate_hashing(budget_ms: Optional[float] = None, scheme: Optional[str] = None) -> Tuple:
+    """Pick cost parameters for `scheme` so one hash takes about `budget_ms`.
+
+    Runs once per scheme (call it at startup); later calls return the cached
+    parameters unless an explicit budget is given.
+    """
+    scheme = scheme or HASH_SCHEME
+    with _calibrate_lock:
+        if budget_ms is not None or scheme not in _hash_params:
+            _hash_params[scheme] = HASHERS[scheme][1](budget_ms or HASH_BUDGET_MS)
+        return _hash_params[scheme]
+
+def hash_password(password: str, salt: str) -> str:
+    """Hash with the current scheme and calibrated cost, in the stored format."""
+    params = calibrate_hashing()
+    digest = HASHERS[HASH_SCHEME][0](password, salt, *params)
+    return "$".join([HASH_SCHEME, *map(str, params), digest])
+
+def verify_password(password: str, salt: str, stored: str) -> bool:
+    """Check against any supported format, using the cost recorded in the hash."""
+    if "$" not in stored:
+        return secrets.compare_digest(_hash_password(password, salt), stored)
+    scheme, *params, digest = stored.split("$")
+    if scheme not in HASHERS:
+        return False
+    return secrets.compare_digest(HASHERS[scheme][0](password, salt, *map(int, params)), digest)
+
+def needs_rehash(stored: str) -> bool:
+    """True for legacy hashes, other schemes, or a cost below the current one."""
+    scheme, *params, _digest = stored.split("$") if "$" in stored else ("", "")
+    if scheme != HASH_SCHEME:
+        return True
+    return tuple(map(int, params)) < calibrate_hashing()
+
+SESSION_TTL = 8 * 3600
+SESSION_MAX = 10000
+
+class SessionStore:
+    """In-memory session tokens with a TTL and a bounded size.
+
+    Tokens live in an OrderedDict in expiry order (every token gets the same
+    TTL), so validation is a dict lookup and eviction pops from the front.
+    A per-user index makes revoking all of a user's sessions cheap.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_size: int = SESSION_MAX):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._sessions = OrderedDict()  # token -> (expires, user_id, username, role)
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def issue(self, user_id: int, username: str, role: str) -> str:
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = (time.monotonic() + self.ttl, user_id, username, role)
+            self._by_user.setdefault(user_id, set()).add(token)
+            while len(self._sessions) > self.max_size:
+                self._drop(next(iter(self._sessions)))
+        return token
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            expires, user_id, username, role = entry
+            if expires <= time.monotonic():
+                self._drop(token)
+                return None
+            return {"user_id": user_id, "username": username, "role": role}
+
+    def revoke(self, token: str) -> None:
+        with self._lock:
+            if token in self._sessions:
+                self._drop(token)
+
+    def revoke_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in list(self._by_user.get(user_id, ())):
+                self._drop(token)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _drop(self, token: str):
+        _, user_id, _, _ = self._sessions.pop(token)
+        tokens = self._by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[user_id]
+
+sessions = SessionStore()
+
 def _hash_password(password: str, salt: str) -> str:
+    """The original unversioned salted SHA-256; kept to verify old rows."""
     return sha256((salt + password).encode('utf-8')).hexdigest()
 
 def get_user_by_username(username: str) -> Optional[Tuple]:
@@ -14,7 +155,7 @@ def get_user_by_username(username: str) -> Optional[Tuple]:
 
 def create_user(username: str, password: str, role: str = "user") -> int:
     salt = secrets.token_hex(16)
-    pwd_hash = _hash_password(password, salt)
+    pwd_hash = hash_password(password, salt)
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute("INSERT INTO users(username, password_hash, salt, role) VALUES(?,?,?,?)",
@@ -22,12 +163,40 @@ def create_user(username: str, password: str, role: str = "user") -> int:
         conn.commit()
         return cur.lastrowid
 
-def validate_login(username: str, password: str) -> bool:
+def _check_credentials(username: str, password: str) -> Optional[Tuple]:
     user = get_user_by_username(username)
     if not user:
-        return False
-    _id, _u, pwd_hash, salt, role = user
-    return _hash_password(password, salt) == pwd_hash
+        return None
+    user_id, _u, pwd_hash, salt, role = user
+    if not verify_password(password, salt, pwd_hash):
+        return None
+    if needs_rehash(pwd_hash):
+        salt = secrets.token_hex(16)
+        new_hash = hash_password(password, salt)
+        with get_conn() as conn:
+            # guarded on the old hash so a concurrent password change wins
+            conn.execute("UPDATE users SET password_hash=?, salt=? WHERE id=? AND password_hash=?",
+                         (new_hash, salt, user_id, pwd_hash))
+            conn.commit()
+    return user
+
+def validate_login(username: str, password: str) -> bool:
+    return _check_credentials(username, password) is not None
+
+def login(username: str, password: str) -> Optional[str]:
+    """Check credentials once and return a session token (None if invalid)."""
+    user = _check_credentials(username, password)
+    if user is None:
+        return None
+    user_id, username, _hash, _salt, role = user
+    return sessions.issue(user_id, username, role)
+
+def validate_session(token: str) -> Optional[dict]:
+    """Session info for a live token, or None; never touches the database."""
+    return sessions.get(token)
+
+def logout(token: str) -> None:
+    sessions.revoke(token)
 
 def list_users():
     with get_conn() as conn:
@@ -40,12 +209,14 @@ def delete_user(user_id: int) -> None:
         cur = conn.cursor()
         cur.execute("DELETE FROM users WHERE id = ?", (user_id,))
         conn.commit()
+    sessions.revoke_user(user_id)
 
 def change_password(user_id: int, new_password: str) -> None:
     salt = secrets.token_hex(16)
-    pwd_hash = _hash_password(new_password, salt)
+    pwd_hash = hash_password(new_password, salt)
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute("UPDATE users SET password_hash=?, salt=? WHERE id=?",
                     (pwd_hash, salt, user_id))
         conn.commit()
+    sessions.revoke_user(user_id)
@@ -0,0 +1,7 @@
+"""Benchmarks and load tools for the inventory system.
+
+Run from the Task_2 directory so the application modules are importable:
+
+    python -m bench.generate --db /tmp/bench.db --products 100000 --sales 1000000
+    python -m bench.run --db /tmp/bench.db
+"""
@@ -0,0 +1,97 @@
+"""Time analytics.forecast() for a whole catalog against a query per product.
+
+    python bench/analytics_bench.py --products 100000 --years 3 --sales 3000000
+
+Sales are spread over `--years` up to the report day, with Zipf-like product
+popularity. The per-product baseline runs one indexed query per product over
+raw sales, for a sample of `--sample` products, and is scaled to the full
+catalog. Its window sums for the sample are checked against forecast()'s.
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+import db
+
+AS_OF = datetime.date(2025, 12, 31)
+
+def fill(n_products: int, n_sales: int, years: int, seed: int = 5):
+    rnd = random.Random(seed)
+    end = datetime.datetime.combine(AS_OF, datetime.time()) + datetime.timedelta(days=1)
+    span = years * 365 * 86400
+    cum = list(itertools.accumulate(1 / (rank + 1) ** 0.9 for rank in range(n_products)))
+    with db.get_conn() as conn:
+        conn.executemany("INSERT INTO products(name, sku, price, quantity) VALUES(?,?,?,?)",
+                         ((f"Product {i}", f"SKU{i:06d}", 4.5, rnd.randint(0, 400)) for i in range(n_products)))
+        conn.commit()
+        for base in range(0, n_sales, 100000):
+            n = min(100000, n_sales - base)
+            pids = rnd.choices(range(1, n_products + 1), cum_weights=cum, k=n)
+            conn.executemany(
+                "INSERT INTO sales(product_id, quantity, unit_price, total, ts) VALUES(?,?,?,?,?)",
+                ((pid, q, 4.5, 4.5 * q, (end - datetime.timedelta(seconds=rnd.randrange(1, span))).isoformat())
+                 for pid, q in zip(pids, (rnd.randint(1, 5) for _ in range(n)))))
+            conn.commit()
+
+def per_product(pids, windows):
+    """Window sums for `pids` from one raw-sales query per product."""
+    starts = [(AS_OF - datetime.timedelta(days=w - 1)).isoformat() for w in windows]
+    case = ", ".join("COALESCE(SUM(CASE WHEN ts >= ? THEN quantity END), 0)" for _ in windows)
+    end = (AS_OF + datetime.timedelta(days=1)).isoformat()
+    out = {}
+    with db.get_conn() as conn:
+        for pid in pids:
+            out[pid] = conn.execute(f"SELECT {case} FROM sales WHERE product_id = ? AND ts >= ? AND ts < ?",
+                                    (*starts, pid, starts[-1], end)).fetchone()
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=100000)
+    ap.add_argument("--years", type=int, default=3)
+    ap.add_argument("--sales", type=int, default=3000000)
+    ap.add_argument("--sample", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    db.configure(os.path.join(tempfile.mkdtemp(), "analytics.db"))
+    db.init_db()
+    t0 = time.perf_counter()
+    fill(args.products, args.sales, args.years)
+    print(f"loaded {args.products:,} products, {args.sales:,} sales over {args.years} years "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+    samples = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        result = analytics.forecast(AS_OF.isoformat())
+        samples.append(time.perf_counter() - t0)
+    print(f"forecast():   {statistics.median(samples):7.2f}s for {result['products']:,} products "
+          f"({result['rows']:,} rollup rows), {result['reorder_total']:,} to reorder")
+
+    windows = sorted(set(analytics.WINDOWS) | {analytics.VELOCITY_WINDOW})
+    sample = random.Random(1).sample(range(1, args.products + 1), min(args.sample, args.products))
+    t0 = time.perf_counter()
+    baseline = per_product(sample, windows)
+    elapsed = time.perf_counter() - t0
+    print(f"per product:  {elapsed * args.products / len(sample):7.2f}s estimated for {args.products:,} products "
+          f"({elapsed / len(sample) * 1000:.2f} ms/product over {len(sample):,})")
+
+    with db.get_conn() as conn:
+        ids, *_ = analytics._load_catalog(conn)
+        position = {pid: i for i, pid in enumerate(ids)}
+        sums, _ = analytics._window_sums(conn, position, AS_OF, windows)
+    bad = [pid for pid in sample if tuple(s[position[pid]] for s in sums) != tuple(baseline[pid])]
+    print("window sums match" if not bad else f"MISMATCH for {len(bad)} products, e.g. {bad[0]}")
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
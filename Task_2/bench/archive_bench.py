@@ -0,0 +1,67 @@
+"""Show hot-path latency staying flat as sales history grows, once archived.
+
+    python bench/archive_bench.py --years 1 4 16 --per-day 200
+
+Each run generates `years` of history at a fixed daily sales rate and times
+the same recent-day operations with all history in the main database, then
+again after archiving everything older than one year into partitions.
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive
+import db
+import inventory
+import reports
+import sales
+from bench.generate import generate
+from bench.run import measure
+
+DATE_TO = "2025-12-31"
+
+def hot_path(pid: int):
+    last_month = (datetime.date.fromisoformat(DATE_TO) - datetime.timedelta(days=30)).isoformat()
+    return [
+        ("record_sale", lambda i: sales.record_sale(pid, 1, 1.0), 300),
+        ("list_sales_page", lambda i: sales.list_sales_page(), 200),
+        ("list_sales_30d", lambda i: sales.list_sales(last_month, DATE_TO), 50),
+        ("summary_raw_30d", lambda i: reports.sales_summary_raw(last_month, DATE_TO), 50),
+        ("summary_30d", lambda i: reports.sales_summary(last_month, DATE_TO), 100),
+    ]
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--years", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--per-day", type=int, default=200)
+    ap.add_argument("--products", type=int, default=1000)
+    ap.add_argument("--granularity", choices=["year", "month"], default=archive.ARCHIVE_GRANULARITY)
+    args = ap.parse_args()
+
+    print(f"{'years':>5} {'sales':>9} {'operation':<16} {'p95 ms before':>14} {'p95 ms archived':>16}")
+    end = datetime.date.fromisoformat(DATE_TO)
+    for years in args.years:
+        n_sales = years * 365 * args.per_day
+        date_from = end.replace(year=end.year - years) + datetime.timedelta(days=1)
+        path = os.path.join(tempfile.mkdtemp(), "archive.db")
+        generate(path, products=args.products, sales=n_sales, users=0,
+                 date_from=date_from.isoformat(), date_to=DATE_TO)
+        db.configure(path)
+        db.init_db()
+        pid = inventory.add_product("Bench item", f"BENCH-{time.time_ns()}", 1.0, 10 ** 9)
+        before = {name: measure(fn, n) for name, fn, n in hot_path(pid)}
+        horizon = (end - datetime.timedelta(days=365)).isoformat()
+        archive.archive_sales(horizon, args.granularity)
+        archive.compact()
+        after = {name: measure(fn, n) for name, fn, n in hot_path(pid)}
+        for name in before:
+            print(f"{years:>5} {n_sales:>9} {name:<16} {before[name]['p95_ms']:>14.3f} {after[name]['p95_ms']:>16.3f}")
+        db.close_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Several processes race to sell the last units of one product.
+
+    python bench/contention.py --procs 8 --stock 5000
+
+Reports sales/sec and fails if more units were sold than were in stock.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import inventory
+import reports
+import sales
+
+def till(path: str, pid: int, qty: int, start, counts):
+    db.configure(path)
+    start.wait()
+    sold = 0
+    while True:
+        try:
+            sales.record_sale(pid, qty, 1.0)
+            sold += 1
+        except ValueError:
+            break
+    counts.put(sold)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--procs", type=int, default=8)
+    ap.add_argument("--stock", type=int, default=5000)
+    ap.add_argument("--qty", type=int, default=1, help="units per sale")
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "contention.db")
+    db.configure(path)
+    db.init_db()
+    pid = inventory.add_product("Last units", "CONTENDED", 1.0, args.stock)
+    db.close_pool()
+
+    start, counts = mp.Event(), mp.Queue()
+    procs = [mp.Process(target=till, args=(path, pid, args.qty, start, counts))
+             for _ in range(args.procs)]
+    for p in procs:
+        p.start()
+    t0 = time.perf_counter()
+    start.set()
+    sold = sum(counts.get() for _ in procs)
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+
+    db.configure(path)
+    orders, units, _ = reports.sales_summary()
+    left = inventory.get_product(pid)[4]
+    print(f"procs={args.procs} sales={sold} in {elapsed:.2f}s -> {sold / elapsed:.0f} sales/s")
+    print(f"units sold={units} left={left} stock={args.stock}")
+    ok = orders == sold and units + left == args.stock and left >= 0 and left < args.qty
+    print("no oversell" if ok else "OVERSELL / LOST UPDATE")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Compare a nightly delta export with full exports as history grows.
+
+    python bench/delta_bench.py --sales 100000 1000000 --changes 1000
+
+Each run then checks that archiving doesn't hide sales from delta exports:
+sales recorded after the last delta are archived before the next one, and a
+new target's first delta must still contain every sale.
+"""
+import argparse
+import csv
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive
+import db
+import inventory
+import reports
+import sales
+from bench.generate import generate
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+def sales_rows(manifest) -> int:
+    with open(reports.EXPORT_DIR / manifest["sales"]["file"], newline="") as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+def check_archived(n_new: int) -> bool:
+    """Archive everything, including sales not yet exported, then delta-export."""
+    for i in range(n_new):
+        sales.record_sale(1 + i, 1, 1.0)
+    archive.archive_sales(before="2100-01-01")
+    manifest = reports.export_delta("bench")
+    with db.get_conn() as conn:
+        total = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='sales'").fetchone()[0]
+    first = reports.export_delta("fresh")
+    ok = (manifest["sales"]["rows"] == sales_rows(manifest) == n_new
+          and first["sales"]["rows"] == sales_rows(first) == total)
+    print(f"{'':>10} after archiving: delta {manifest['sales']['rows']}/{n_new} new sales, "
+          f"new target {first['sales']['rows']}/{total} sales: {'ok' if ok else 'MISSING SALES'}")
+    return ok
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sales", type=int, nargs="+", default=[100000, 1000000])
+    ap.add_argument("--products", type=int, default=10000)
+    ap.add_argument("--changes", type=int, default=1000, help="sales and product edits per 'day'")
+    args = ap.parse_args()
+
+    ok = True
+    print(f"{'sales':>10} {'full inv s':>10} {'full sales s':>12} {'delta s':>8} {'delta rows':>10}")
+    for n_sales in args.sales:
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "delta.db")
+        generate(path, products=args.products, sales=n_sales, users=0)
+        db.configure(path)
+        db.init_db()
+        reports.EXPORT_DIR = pathlib.Path(tmp)
+        reports.export_delta("bench")  # initial full sync sets the cursors
+
+        for i in range(args.changes):
+            pid = 1 + i % args.products
+            if i % 2:
+                sales.record_sale(pid, 1, 1.0)
+            else:
+                inventory.adjust_stock(pid, 5)
+        _, full_inv = timed(reports.export_inventory_csv)
+        _, full_sales = timed(reports.export_sales_csv)
+        manifest, delta = timed(reports.export_delta, "bench")
+        rows = manifest["products"]["rows"] + manifest["sales"]["rows"]
+        print(f"{n_sales:>10} {full_inv:>10.2f} {full_sales:>12.2f} {delta:>8.3f} {rows:>10}")
+        ok = check_archived(10) and ok
+        db.close_pool()
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Check that date-filtered sales queries use the ts indexes, not a full scan.
+
+    python bench/explain_sales.py --rows 1000000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive
+import db
+import reports
+import sales
+
+DATE_FROM, DATE_TO = "2023-03-01", "2023-03-31"
+SCANNED = ("s", "sales", "main.sales", "sales_daily")  # a SCAN of these is a failure
+
+def statements(conn):
+    """(name, sql, params) for each date-filtered query, built by the same
+    helpers the real functions use."""
+    yield ("sales_summary", *reports._summary_query(DATE_FROM, DATE_TO))
+    per_table = {
+        "list_sales": sales._sales_query(DATE_FROM, DATE_TO),
+        "list_sales_page": sales._sales_query(DATE_FROM, DATE_TO, ("2023-03-15T00:00:00", 1 << 62), 200),
+        "sales_summary_raw": reports._summary_raw_query(DATE_FROM, DATE_TO),
+    }
+    for name, (query, params) in per_table.items():
+        for sql, union_params in archive.sales_union(conn, query, params, DATE_FROM, DATE_TO):
+            yield name, sql, union_params
+
+def fill(rows: int):
+    start = datetime.datetime(2020, 1, 1)
+    rnd = random.Random(42)
+    with db.get_conn() as conn:
+        conn.executemany("INSERT INTO products(name, sku, price, quantity) VALUES(?,?,?,?)",
+                         ((f"P{i}", f"SKU{i}", 1.0, 100) for i in range(100)))
+        conn.executemany(
+            "INSERT INTO sales(product_id, quantity, unit_price, total, ts) VALUES(?,?,?,?,?)",
+            ((rnd.randint(1, 100), 1, 1.0, 1.0,
+              (start + datetime.timedelta(seconds=rnd.randrange(5 * 365 * 86400))).isoformat())
+             for _ in range(rows)))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100000)
+    args = ap.parse_args()
+    db.configure(os.path.join(tempfile.mkdtemp(), "explain.db"))
+    db.init_db()
+    fill(args.rows)
+
+    failed = False
+    with db.get_conn() as conn:
+        for name, query, params in list(statements(conn)):
+            plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+            t0 = time.perf_counter()
+            conn.execute(query, params).fetchall()
+            elapsed = time.perf_counter() - t0
+            full_scan = any(p.split()[:2] in (["SCAN", t] for t in SCANNED) for p in plan)
+            failed |= full_scan
+            print(f"{name}: {elapsed * 1000:.1f} ms  {'FULL SCAN' if full_scan else 'indexed'}")
+            for p in plan:
+                print("   ", p)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
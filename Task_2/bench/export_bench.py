@@ -0,0 +1,70 @@
+"""Measure peak memory and rows/sec of the streaming sales CSV export.
+
+    python bench/export_bench.py --sales 1000000 10000000 [--gzip]
+
+Each export runs in a fresh child process so its peak RSS is not polluted by
+the data generation in the parent.
+"""
+import argparse
+import datetime
+import multiprocessing as mp
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+def fill(path: str, n_sales: int, n_products: int = 1000):
+    db.configure(path)
+    db.init_db()
+    rnd = random.Random(7)
+    start = datetime.datetime(2020, 1, 1)
+    with db.get_conn() as conn:
+        conn.executemany("INSERT INTO products(name, sku, price, quantity) VALUES(?,?,?,?)",
+                         ((f"Product {i}", f"SKU{i}", 9.99, 100) for i in range(n_products)))
+        for base in range(0, n_sales, 100000):
+            conn.executemany(
+                "INSERT INTO sales(product_id, quantity, unit_price, total, ts) VALUES(?,?,?,?,?)",
+                ((rnd.randint(1, n_products), 1, 9.99, 9.99,
+                  (start + datetime.timedelta(seconds=rnd.randrange(5 * 365 * 86400))).isoformat())
+                 for _ in range(min(100000, n_sales - base))))
+            conn.commit()
+    db.close_pool()
+
+def export_child(path: str, out_dir: str, compress: bool, profile: str, result):
+    import reports
+    db.configure(path, profile=profile)
+    reports.EXPORT_DIR = __import__("pathlib").Path(out_dir)
+    rows = [0]
+    t0 = time.perf_counter()
+    out = reports.export_sales_csv(compress=compress, progress=lambda n: rows.__setitem__(0, n))
+    elapsed = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result.put((rows[0], elapsed, peak_kb, os.path.getsize(out)))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sales", type=int, nargs="+", default=[1000000])
+    ap.add_argument("--gzip", action="store_true")
+    ap.add_argument("--profile", default=db.PROFILE, choices=sorted(db.PROFILES),
+                    help="note: mmap'd and cached pages count towards RSS up to the profile limits")
+    args = ap.parse_args()
+    for n in args.sales:
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, "export.db")
+        fill(path, n)
+        result = mp.Queue()
+        p = mp.Process(target=export_child, args=(path, tmp, args.gzip, args.profile, result))
+        p.start()
+        rows, elapsed, peak_kb, size = result.get()
+        p.join()
+        print(f"sales={n:>10}  rows={rows}  {rows / elapsed:,.0f} rows/s  "
+              f"peak RSS={peak_kb / 1024:.1f} MB  file={size / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
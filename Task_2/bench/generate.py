@@ -0,0 +1,83 @@
+"""Fill a database with seeded synthetic products, sales and users.
+
+    python -m bench.generate --db /tmp/bench.db --products 100000 --sales 1000000 --users 50
+"""
+import argparse
+import datetime
+import random
+import secrets
+import sys
+import time
+
+import auth
+import db
+
+WORDS = ["apple", "banana", "cable", "drill", "eraser", "filter", "glove", "hammer",
+         "ink", "jacket", "kettle", "lamp", "marker", "nail", "oil", "paper",
+         "quartz", "rope", "screw", "tape", "usb", "valve", "washer", "yarn", "zip"]
+BATCH = 50000
+
+def user_password(i: int) -> str:
+    return f"user{i}pass"
+
+def _batches(total: int):
+    for base in range(0, total, BATCH):
+        yield base, min(BATCH, total - base)
+
+def generate(path, products: int = 10000, sales: int = 100000, users: int = 10,
+             date_from: str = "2021-01-01", date_to: str = "2025-12-31", seed: int = 1) -> dict:
+    """Create `path` and fill it; the same arguments always give the same data.
+
+    Users are named user0..userN-1 with password user_password(i). Sales are
+    spread uniformly over [date_from, date_to] and do not touch stock levels.
+    """
+    rnd = random.Random(seed)
+    db.configure(path)
+    db.init_db()
+    start = datetime.datetime.fromisoformat(date_from)
+    span = int((datetime.datetime.fromisoformat(date_to) + datetime.timedelta(days=1) - start).total_seconds())
+    t0 = time.perf_counter()
+    with db.get_conn() as conn:
+        for base, n in _batches(products):
+            conn.executemany(
+                "INSERT INTO products(name, sku, price, quantity, reorder_level) VALUES(?,?,?,?,?)",
+                [(f"{rnd.choice(WORDS)} {rnd.choice(WORDS)} {base + i}", f"SKU-{base + i:08d}",
+                  round(rnd.uniform(0.5, 200), 2), rnd.randint(0, 500), rnd.randint(0, 20))
+                 for i in range(n)])
+            conn.commit()
+        for base, n in _batches(sales):
+            rows = []
+            for _ in range(n):
+                qty = rnd.randint(1, 5)
+                price = round(rnd.uniform(0.5, 200), 2)
+                ts = start + datetime.timedelta(seconds=rnd.randrange(span))
+                rows.append((rnd.randint(1, products), qty, price, round(price * qty, 2),
+                             ts.isoformat(timespec="seconds")))
+            conn.executemany("INSERT INTO sales(product_id, quantity, unit_price, total, ts) VALUES(?,?,?,?,?)", rows)
+            conn.commit()
+        # legacy SHA-256 rows keep generation fast; they are rehashed with the
+        # KDF on each user's first login
+        user_rows = []
+        for i in range(users):
+            salt = secrets.token_hex(16)
+            user_rows.append((f"user{i}", auth._hash_password(user_password(i), salt), salt, "user"))
+        conn.executemany("INSERT OR IGNORE INTO users(username, password_hash, salt, role) VALUES(?,?,?,?)", user_rows)
+    return {"products": products, "sales": sales, "users": users,
+            "seconds": round(time.perf_counter() - t0, 2)}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--products", type=int, default=10000)
+    ap.add_argument("--sales", type=int, default=100000)
+    ap.add_argument("--users", type=int, default=10)
+    ap.add_argument("--from", dest="date_from", default="2021-01-01")
+    ap.add_argument("--to", dest="date_to", default="2025-12-31")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    stats = generate(args.db, args.products, args.sales, args.users, args.date_from, args.date_to, args.seed)
+    print(f"generated {stats['products']} products, {stats['sales']} sales, "
+          f"{stats['users']} users in {stats['seconds']}s")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Load-test a running server.py instance with keep-alive connections.
+
+    python server.py --port 8080 &
+    python bench/load_http.py --url http://127.0.0.1:8080 --connections 32 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+PATHS = [
+    "/api/products?limit=50",
+    "/api/products/search?q=ham&limit=20",
+    "/api/sales?limit=50",
+    "/api/reports/summary",
+    "/api/reports/low-stock/count",
+    "/api/products/1",
+]
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    status = int(status_line.split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "transfer-encoding" and "chunked" in value:
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return status
+
+async def client(host, port, auth, deadline, latencies, errors, rnd):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            path = rnd.choice(PATHS)
+            t0 = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAuthorization: {auth}\r\n\r\n".encode())
+            status = await read_response(reader)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if status >= 400:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def run(args):
+    url = urlsplit(args.url)
+    # one login up front; Basic auth would run the password KDF on every request
+    body = json.dumps({"username": args.user, "password": args.password}).encode()
+    with urlopen(args.url.rstrip("/") + "/api/login", data=body) as resp:
+        auth = "Bearer " + json.load(resp)["token"]
+    deadline = time.perf_counter() + args.seconds
+    latencies, errors = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(url.hostname, url.port or 80, auth, deadline, latencies, errors,
+                                  random.Random(i)) for i in range(args.connections)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{len(latencies)} requests in {elapsed:.1f}s over {args.connections} connections: "
+          f"{len(latencies) / elapsed:.0f} req/s")
+    if latencies:
+        print(f"latency ms: p50={statistics.median(latencies):.2f} "
+              f"p95={latencies[int(len(latencies) * 0.95)]:.2f} "
+              f"p99={latencies[int(len(latencies) * 0.99)]:.2f}")
+    if errors:
+        print(f"error responses: {errors}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:8080")
+    ap.add_argument("--connections", type=int, default=32)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--user", default="admin")
+    ap.add_argument("--password", default="admin123")
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure login latency percentiles at the calibrated password-hashing cost.
+
+    python bench/login_bench.py --budget-ms 100 --logins 200 --threads 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth
+import db
+from bench.run import percentile
+
+def timed_logins(users, logins: int, threads: int) -> list:
+    samples, lock = [], threading.Lock()
+
+    def worker(offset):
+        for i in range(offset, logins, threads):
+            name = users[i % len(users)]
+            t0 = time.perf_counter()
+            if not auth.validate_login(name, name + "-pw"):
+                raise RuntimeError(f"login failed for {name}")
+            with lock:
+                samples.append((time.perf_counter() - t0) * 1000)
+
+    pool = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return samples
+
+def report(label: str, samples: list):
+    print(f"{label:<22} n={len(samples):<5} p50={percentile(samples, 50):8.2f} ms  "
+          f"p95={percentile(samples, 95):8.2f} ms  p99={percentile(samples, 99):8.2f} ms")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--budget-ms", type=float, default=auth.HASH_BUDGET_MS)
+    ap.add_argument("--scheme", default=auth.HASH_SCHEME, choices=sorted(auth.HASHERS))
+    ap.add_argument("--logins", type=int, default=200)
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--users", type=int, default=20)
+    args = ap.parse_args()
+
+    db.configure(os.path.join(tempfile.mkdtemp(), "login.db"))
+    db.init_db()
+    auth.HASH_SCHEME = args.scheme
+    t0 = time.perf_counter()
+    params = auth.calibrate_hashing(args.budget_ms)
+    print(f"scheme={args.scheme} params={params} "
+          f"(calibrated in {(time.perf_counter() - t0) * 1000:.0f} ms for a {args.budget_ms:g} ms budget)")
+
+    users = [f"user{i}" for i in range(args.users)]
+    with db.get_conn() as conn:
+        # legacy rows, so the first pass exercises upgrade-on-login
+        for name in users:
+            conn.execute("INSERT INTO users(username, password_hash, salt, role) VALUES(?,?,?,?)",
+                         (name, auth._hash_password(name + "-pw", "s"), "s", "user"))
+        conn.commit()
+    report("legacy + upgrade", timed_logins(users, len(users), args.threads))
+    report(f"login x{args.threads} threads", timed_logins(users, args.logins, args.threads))
+    report("login x1 thread", timed_logins(users, max(1, args.logins // 4), 1))
+
+if __name__ == "__main__":
+    main()
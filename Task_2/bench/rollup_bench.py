@@ -0,0 +1,70 @@
+"""Compare sales_summary() on the daily rollup with the raw-table aggregate.
+
+    python bench/rollup_bench.py --sales 2000000 --years 5
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import reports
+
+def fill(n_sales: int, years: int, n_products: int = 100):
+    rnd = random.Random(11)
+    start = datetime.datetime(2020, 1, 1)
+    span = years * 365 * 86400
+    with db.get_conn() as conn:
+        conn.executemany("INSERT INTO products(name, sku, price, quantity) VALUES(?,?,?,?)",
+                         ((f"Product {i}", f"SKU{i}", 4.5, 100) for i in range(n_products)))
+        for base in range(0, n_sales, 100000):
+            conn.executemany(
+                "INSERT INTO sales(product_id, quantity, unit_price, total, ts) VALUES(?,?,?,?,?)",
+                ((rnd.randint(1, n_products), q, 4.5, 4.5 * q,
+                  (start + datetime.timedelta(seconds=rnd.randrange(span))).isoformat())
+                 for q in (rnd.randint(1, 5) for _ in range(min(100000, n_sales - base)))))
+            conn.commit()
+
+def timed(fn, *args, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), result
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sales", type=int, default=2000000)
+    ap.add_argument("--years", type=int, default=5)
+    args = ap.parse_args()
+    db.configure(os.path.join(tempfile.mkdtemp(), "rollup.db"))
+    db.init_db()
+    t0 = time.perf_counter()
+    fill(args.sales, args.years)
+    print(f"loaded {args.sales} sales over {args.years} years in {time.perf_counter() - t0:.1f}s")
+
+    ranges = {
+        "all history": (None, None),
+        "one year": ("2021-01-01", "2021-12-31"),
+        "one month": ("2022-03-01", "2022-03-31"),
+        "one day": ("2023-07-14", "2023-07-14"),
+    }
+    print(f"{'range':<14}{'raw ms':>10}{'rollup ms':>11}  match")
+    for label, (f, t) in ranges.items():
+        raw_ms, raw = timed(reports.sales_summary_raw, f, t)
+        roll_ms, roll = timed(reports.sales_summary, f, t)
+        match = raw[:2] == roll[:2] and abs(raw[2] - roll[2]) < 1e-6 * max(1.0, raw[2])
+        print(f"{label:<14}{raw_ms:>10.2f}{roll_ms:>11.2f}  {'yes' if match else 'NO'}")
+    t0 = time.perf_counter()
+    bad = reports.check_sales_daily()
+    print(f"consistency check: {len(bad)} mismatches in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
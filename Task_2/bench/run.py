@@ -0,0 +1,172 @@
+"""Time the main Task_2 code paths and compare them with a stored baseline.
+
+    python -m bench.run --db /tmp/bench.db [--out result.json]
+    python -m bench.run --db /tmp/bench.db --save-baseline
+
+Prints p50/p95/p99 latency (ms) and throughput (ops/s) per operation as
+JSON. The suite runs --rounds times, interleaved, and best_ms is the lowest
+round's trimmed mean: a burst of machine noise slows some rounds, not all of
+them. With a baseline present, exits non-zero when any best_ms is more than
+--tolerance and --min-delta-ms slower than the baseline. Tail percentiles
+of a few hundred samples move between identical runs, so they are reported
+but not compared. Shared or throttled hosts can run a whole process tens of
+percent slower than a minute earlier; compare there with a wider
+--tolerance, or save the baseline and compare in the same sitting.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import auth
+import db
+import inventory
+import reports
+import sales
+from bench.generate import WORDS, user_password
+
+BASELINE = Path(__file__).with_name("baseline.json")
+MIN_ITERATIONS = 30  # --scale never cuts an operation below this many samples
+TRIM = 10  # percent of samples dropped from each end of a round
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def trimmed_mean(samples, pct=TRIM):
+    ordered = sorted(samples)
+    cut = len(ordered) * pct // 100
+    kept = ordered[cut:len(ordered) - cut]
+    return sum(kept) / len(kept)
+
+def timed(fn, iterations: int):
+    """One round: (per-call ms samples, elapsed seconds)."""
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, time.perf_counter() - started
+
+def summarise(rounds) -> dict:
+    samples = [ms for round_samples, _ in rounds for ms in round_samples]
+    return {"n": len(samples),
+            "p50_ms": round(percentile(samples, 50), 4),
+            "p95_ms": round(percentile(samples, 95), 4),
+            "p99_ms": round(percentile(samples, 99), 4),
+            "best_ms": round(min(trimmed_mean(s) for s, _ in rounds), 4),
+            "ops_per_sec": round(len(samples) / sum(elapsed for _, elapsed in rounds), 1)}
+
+def measure(fn, iterations: int, rounds: int = 1) -> dict:
+    return summarise([timed(fn, iterations) for _ in range(rounds)])
+
+def suite(seed: int, scale: float):
+    """(name, fn(i), iterations) for every benchmarked operation."""
+    rnd = random.Random(seed)
+    with db.get_conn() as conn:
+        n_products = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        n_users = conn.execute("SELECT COUNT(*) FROM users WHERE username LIKE 'user%'").fetchone()[0]
+    # log the first few users in once so legacy hashes are upgraded and the
+    # timed logins measure steady-state KDF verification
+    n_users = min(n_users, 10)
+    for i in range(n_users):
+        auth.validate_login(f"user{i}", user_password(i))
+    pid = inventory.add_product("Bench item", f"BENCH-{time.time_ns()}", 1.0, 10 ** 9)
+    export_dir = Path(tempfile.mkdtemp())
+    reports.EXPORT_DIR = export_dir
+
+    def n(base):
+        return max(min(base, MIN_ITERATIONS), int(base * scale))
+
+    def month(i):
+        y, m = 2021 + (i % 5), 1 + (i % 12)
+        return f"{y}-{m:02d}-01", f"{y}-{m:02d}-28"
+
+    return [
+        ("record_sale", lambda i: sales.record_sale(pid, 1, 1.0), n(500)),
+        ("list_sales_page", lambda i: sales.list_sales_page(), n(200)),
+        ("list_sales_page_month", lambda i: sales.list_sales_page(*month(i)), n(200)),
+        ("list_sales_month", lambda i: sales.list_sales(*month(i)), n(20)),
+        ("sales_summary", lambda i: reports.sales_summary(), n(50)),
+        ("sales_summary_month", lambda i: reports.sales_summary(*month(i)), n(200)),
+        ("low_stock", lambda i: reports.low_stock_page(5), n(200)),
+        ("low_stock_count", lambda i: reports.low_stock_count(5), n(200)),
+        ("search_products", lambda i: inventory.search_products(rnd.choice(WORDS)[:3]), n(200)),
+        ("list_products_page", lambda i: inventory.list_products_page(rnd.choice(WORDS)), n(200)),
+        ("get_product", lambda i: inventory.get_product(1 + i % max(1, n_products)), n(2000)),
+        ("validate_login", lambda i: auth.validate_login(f"user{i % max(1, n_users)}",
+                                                         user_password(i % max(1, n_users))), n(50)),
+        ("export_inventory_csv", lambda i: reports.export_inventory_csv(), n(3)),
+        ("export_sales_csv", lambda i: reports.export_sales_csv(), n(3)),
+    ]
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float):
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        # baselines saved before best_ms was recorded fall back to the median
+        stat = "best_ms" if "best_ms" in base else "p50_ms"
+        # the absolute floor keeps microsecond-scale operations from flapping
+        if res[stat] > base[stat] * (1 + tolerance) and res[stat] - base[stat] > min_delta_ms:
+            regressions.append(f"{name}: {stat} {res[stat]} ms vs baseline {base[stat]} ms")
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", required=True, help="database created by bench.generate (it is modified)")
+    ap.add_argument("--only", nargs="*", help="run only these operations")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply iteration counts")
+    ap.add_argument("--rounds", type=int, default=3, help="interleaved passes over the suite")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="also write the JSON results here")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    ap.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = ap.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        ap.error(f"{args.db} does not exist; create it with python -m bench.generate")
+    db.configure(args.db)
+    db.init_db()
+    ops = [op for op in suite(args.seed, args.scale) if not args.only or op[0] in args.only]
+    for _, fn, _ in ops:
+        fn(0)  # warm up caches and the connection pool
+    rounds = {name: [] for name, _, _ in ops}
+    for _ in range(args.rounds):
+        for name, fn, iterations in ops:
+            rounds[name].append(timed(fn, iterations))
+    results = {}
+    for name, samples in rounds.items():
+        results[name] = res = summarise(samples)
+        print(f"{name:<24} p50={res['p50_ms']:.3f} p95={res['p95_ms']:.3f} p99={res['p99_ms']:.3f} "
+              f"best={res['best_ms']:.3f} ms  {res['ops_per_sec']} ops/s", file=sys.stderr)
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.out:
+        Path(args.out).write_text(report)
+    if args.save_baseline:
+        Path(args.baseline).write_text(report)
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+    if os.path.exists(args.baseline):
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()),
+                              args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print("REGRESSION " + line, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Compare FTS5 prefix search with the LIKE '%x%' scan on a large catalog.
+
+    python bench/search_bench.py --products 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import inventory
+
+WORDS = ["apple", "banana", "cable", "drill", "eraser", "filter", "glove", "hammer",
+         "ink", "jacket", "kettle", "lamp", "marker", "nail", "oil", "paper",
+         "quartz", "rope", "screw", "tape", "usb", "valve", "washer", "yarn", "zip"]
+
+def fill(n: int):
+    rnd = random.Random(3)
+    with db.get_conn() as conn:
+        for base in range(0, n, 50000):
+            conn.executemany(
+                "INSERT INTO products(name, sku, price, quantity) VALUES(?,?,?,?)",
+                ((f"{rnd.choice(WORDS)} {rnd.choice(WORDS)} {i}", f"SKU-{i:08d}", 1.0, 10)
+                 for i in range(base, min(n, base + 50000))))
+            conn.commit()
+
+def like_search(term: str, limit: int):
+    q = "%" + term + "%"
+    with db.get_conn() as conn:
+        return conn.execute("""SELECT id, name, sku, price, quantity, reorder_level FROM products
+                            WHERE name LIKE ? OR sku LIKE ? ORDER BY name LIMIT ?""", (q, q, limit)).fetchall()
+
+def timed(fn, term, limit, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(term, limit)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--products", type=int, default=1000000)
+    ap.add_argument("--limit", type=int, default=inventory.SEARCH_LIMIT)
+    args = ap.parse_args()
+    db.configure(os.path.join(tempfile.mkdtemp(), "search.db"))
+    db.init_db()
+    t0 = time.perf_counter()
+    fill(args.products)
+    print(f"loaded {args.products} products (FTS kept in sync by triggers) in {time.perf_counter() - t0:.1f}s")
+
+    # common words match ~4% of the catalog; SKUs and ids are selective
+    terms = ["ham", "usb cab", "quartz rope", f"SKU-{args.products // 2:08d}",
+             str(args.products - 7), "nomatch"]
+    print(f"{'term':<16}{'LIKE ms':>10}{'FTS5 ms':>10}")
+    for term in terms:
+        like = timed(like_search, term, args.limit)
+        fts = timed(inventory.search_products, term, args.limit)
+        print(f"{term:<16}{like:>10.2f}{fts:>10.2f}")
+
+if __name__ == "__main__":
+    main()
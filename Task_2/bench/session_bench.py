@@ -0,0 +1,37 @@
+"""Compare in-memory session token checks with full credential checks.
+
+    python bench/session_bench.py --iterations 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth
+import db
+
+def per_call_us(fn, iterations: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--iterations", type=int, default=100000)
+    args = ap.parse_args()
+    db.configure(os.path.join(tempfile.mkdtemp(), "session.db"))
+    db.init_db()
+    db.seed_admin_if_missing()
+    token = auth.login("admin", "admin123")
+
+    creds = per_call_us(lambda: auth.validate_login("admin", "admin123"), args.iterations)
+    session = per_call_us(lambda: auth.validate_session(token), args.iterations)
+    print(f"validate_login:   {creds:8.2f} us/call")
+    print(f"validate_session: {session:8.2f} us/call  ({creds / session:.0f}x faster)")
+
+if __name__ == "__main__":
+    main()
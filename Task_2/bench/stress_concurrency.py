@@ -0,0 +1,78 @@
+"""Run N writer threads (record_sale) against M reader threads (export/summary).
+
+    python bench/stress_concurrency.py --writers 4 --readers 4 --seconds 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import inventory
+import reports
+import sales
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--profile", default=db.PROFILE, choices=sorted(db.PROFILES))
+    ap.add_argument("--db", help="database file (default: a temporary file)")
+    args = ap.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "stress.db")
+    db.configure(path, pool_size=args.writers + args.readers, profile=args.profile)
+    db.init_db()
+    pid = inventory.add_product("Stress item", f"STRESS-{time.time_ns()}", 1.0, 10 ** 9)
+
+    stop = threading.Event()
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def writer():
+        while not stop.is_set():
+            try:
+                sales.record_sale(pid, 1, 1.0)
+                bump("writes")
+            except Exception:
+                bump("errors")
+
+    def reader():
+        while not stop.is_set():
+            try:
+                reports.sales_summary()
+                sales.list_sales()
+                bump("reads")
+            except Exception:
+                bump("errors")
+
+    threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    db.checkpoint("TRUNCATE")
+    orders, qty, _ = reports.sales_summary()
+    left = inventory.get_product(pid)[4]
+    print(f"profile={args.profile} writers={args.writers} readers={args.readers}")
+    print(f"writes/s={counts['writes'] / args.seconds:.1f} "
+          f"reads/s={counts['reads'] / args.seconds:.1f} errors={counts['errors']}")
+    ok = orders == counts["writes"] and left == 10 ** 9 - qty
+    print("consistent" if ok else "INCONSISTENT")
+    return 0 if ok and counts["errors"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,367 @@
 import sqlite3
 import os
+import sys
+import threading
+import atexit
+import logging
+import random
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 DB_PATH = Path(__file__).with_name("inventory.db")
+POOL_SIZE = 5
 
+# PRAGMA sets applied once to every new pooled connection. "concurrent" lets
+# report readers and till writers run side by side (WAL); "safe" keeps the
+# SQLite defaults apart from a busy timeout. WAL mode is stored in the database
+# file, so "safe" sets the rollback journal back explicitly.
+PROFILES = {
+    "safe": {
+        "journal_mode": "DELETE",
+        "busy_timeout": 5000,
+    },
+    "concurrent": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,       # KiB, i.e. ~64 MB
+        "mmap_size": 268435456,     # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 1000, # pages
+    },
+}
+PROFILE = "concurrent"
+BUSY_RETRIES = 8
+
+class ConnectionPool:
+    """Keeps up to `size` idle connections open and hands them out per thread.
+
+    A thread that already holds a connection gets the same one back on nested
+    get_conn() calls, so helpers can call each other without deadlocking.
+    """
+
+    def __init__(self, path, size: int = POOL_SIZE, pragmas: dict = None, factory=sqlite3.Connection):
+        self.path = path
+        self.size = size
+        self.pragmas = dict(pragmas or {})
+        self.factory = factory
+        self.hits = 0
+        self.misses = 0
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    def _connect(self):
+        timeout = self.pragmas.get("busy_timeout", 5000) / 1000
+        conn = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, factory=self.factory)
+        conn.execute("PRAGMA foreign_keys = ON;")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value};")
+        return conn
+
+    def acquire(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if conn is None:
+            conn = self._connect()
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle),
+                    "hits": self.hits, "misses": self.misses}
+
+# --- Query profiling -------------------------------------------------------
+# Off by default: the pool then hands out plain sqlite3 connections and there
+# is no per-statement overhead at all. enable_profiling() (or the env var
+# INVENTORY_SQL_PROFILE=1) swaps in connections whose cursors time every
+# statement.
+
+SLOW_QUERY_MS = 100.0
+HISTOGRAM_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float("inf"))
+slow_log = logging.getLogger("inventory.sql.slow")
+
+class QueryStats:
+    """Per (call site, statement) counters and a latency histogram."""
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = SLOW_QUERY_MS
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, site: str, sql: str, ms: float):
+        key = (site, " ".join(sql.split()))
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None:
+                e = self._entries[key] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                                          "histogram": [0] * len(HISTOGRAM_MS)}
+            e["calls"] += 1
+            e["total_ms"] += ms
+            e["max_ms"] = max(e["max_ms"], ms)
+            e["histogram"][next(i for i, b in enumerate(HISTOGRAM_MS) if ms <= b)] += 1
+        if ms >= self.slow_ms:
+            slow_log.warning("slow query %.1f ms at %s: %s", ms, site, key[1])
+        return e
+
+    def add_rows(self, entry, n: int):
+        with self._lock:
+            entry["rows"] += n
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> list:
+        """[(site, sql, counters)] sorted by total time, slowest first."""
+        with self._lock:
+            items = [(site, sql, dict(e, histogram=list(e["histogram"])))
+                     for (site, sql), e in self._entries.items()]
+        return sorted(items, key=lambda item: item[2]["total_ms"], reverse=True)
+
+    def report(self, top: int = 25) -> str:
+        buckets = " ".join(f"<={b:g}" for b in HISTOGRAM_MS[:-1]) + " >"
+        lines = [f"{'calls':>7} {'total ms':>10} {'avg ms':>8} {'max ms':>8} {'rows':>8}  site / statement",
+                 f"histogram buckets (ms): {buckets}"]
+        for site, sql, e in self.snapshot()[:top]:
+            lines.append(f"{e['calls']:>7} {e['total_ms']:>10.1f} {e['total_ms'] / e['calls']:>8.3f} "
+                         f"{e['max_ms']:>8.2f} {e['rows']:>8}  {site}")
+            lines.append(f"{'':>46}{sql[:100]}")
+            lines.append(f"{'':>46}{e['histogram']}")
+        return "\n".join(lines)
+
+query_stats = QueryStats()
+
+_SKIP_FILES = (os.path.abspath(__file__), getattr(sys.modules.get("contextlib"), "__file__", ""))
+
+def _call_site() -> str:
+    f = sys._getframe(2)
+    while f is not None and os.path.abspath(f.f_code.co_filename) in _SKIP_FILES:
+        f = f.f_back
+    if f is None:
+        return "?"
+    module = os.path.splitext(os.path.basename(f.f_code.co_filename))[0]
+    return f"{module}.{f.f_code.co_name}"
+
+class ProfiledCursor(sqlite3.Cursor):
+    _entry = None
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._entry = query_stats.record(_call_site(), sql, (time.perf_counter() - t0) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._entry = query_stats.record(_call_site(), sql, (time.perf_counter() - t0) * 1000)
+
+    def executescript(self, sql_script):
+        t0 = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._entry = query_stats.record(_call_site(), sql_script, (time.perf_counter() - t0) * 1000)
+
+    def _rows(self, rows, n):
+        if self._entry is not None and n:
+            query_stats.add_rows(self._entry, n)
+        return rows
+
+    def fetchone(self):
+        row = super().fetchone()
+        return self._rows(row, row is not None)
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        return self._rows(rows, len(rows))
+
+    def fetchall(self):
+        rows = super().fetchall()
+        return self._rows(rows, len(rows))
+
+    def __next__(self):
+        return self._rows(super().__next__(), 1)
+
+class ProfiledConnection(sqlite3.Connection):
+    # the C-level Connection.execute* shortcuts never call a Python cursor
+    # subclass, so route them through cursor() explicitly
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+def enable_profiling(slow_ms: float = None) -> None:
+    """Start timing every statement; reopens pooled connections."""
+    query_stats.enabled = True
+    if slow_ms is not None:
+        query_stats.slow_ms = slow_ms
+    close_pool()
+
+def disable_profiling() -> None:
+    query_stats.enabled = False
+    close_pool()
+
+def profile_report(top: int = 25) -> str:
+    if not query_stats.enabled:
+        return "SQL profiling is disabled (db.enable_profiling() or INVENTORY_SQL_PROFILE=1)."
+    return query_stats.report(top)
+
+def install_profile_signal(signum=None) -> bool:
+    """Dump profile_report() to stderr on SIGUSR1 (POSIX only).
+
+    The report is built on a new thread: the signal may interrupt the main
+    thread while it holds the query_stats lock.
+    """
+    import signal
+    signum = signum or getattr(signal, "SIGUSR1", None)
+    if signum is None:
+        return False
+
+    def dump():
+        print(profile_report(), file=sys.stderr, flush=True)
+
+    signal.signal(signum, lambda *_: threading.Thread(target=dump, name="sql-profile-dump", daemon=True).start())
+    return True
+
+if os.environ.get("INVENTORY_SQL_PROFILE") == "1":
+    query_stats.enabled = True
+    install_profile_signal()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            factory = ProfiledConnection if query_stats.enabled else sqlite3.Connection
+            _pool = ConnectionPool(DB_PATH, POOL_SIZE, PROFILES[PROFILE], factory)
+        return _pool
+
+def configure(path=None, pool_size: int = None, profile: str = None) -> None:
+    """Point the module at another database file, resize the pool or switch profile."""
+    global DB_PATH, POOL_SIZE, PROFILE
+    if path is not None:
+        DB_PATH = Path(path)
+    if pool_size is not None:
+        POOL_SIZE = pool_size
+    if profile is not None:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile: {profile}")
+        PROFILE = profile
+    close_pool()
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def connect_unpooled():
+    """A private connection with the current profile, outside the pool."""
+    return get_pool()._connect()
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+def checkpoint(mode: str = "PASSIVE"):
+    """Run a WAL checkpoint; returns (busy, log_pages, checkpointed_pages).
+
+    PASSIVE never blocks readers or writers, so it is safe to call from a
+    timer. TRUNCATE also resets the -wal file and suits quiet periods.
+    """
+    mode = mode.upper()
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"Unknown checkpoint mode: {mode}")
+    with get_conn() as conn:
+        return conn.execute(f"PRAGMA wal_checkpoint({mode});").fetchone()
+
+atexit.register(close_pool)
+
+@contextmanager
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.release(conn)
+
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+def _begin_immediate(conn, retries: int):
+    for attempt in range(retries + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            return
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == retries:
+                raise
+            # busy_timeout already waited; back off with jitter before retrying
+            time.sleep(min(0.5, 0.01 * 2 ** attempt) * random.uniform(0.5, 1.5))
+
+@contextmanager
+def write_transaction(retries: int = None):
+    """Like get_conn(), but takes the write lock up front with BEGIN IMMEDIATE.
+
+    Check-and-write logic inside the block cannot interleave with another
+    writer. Commits on success, rolls back on exception.
+    """
+    with get_conn() as conn:
+        if not conn.in_transaction:
+            _begin_immediate(conn, BUSY_RETRIES if retries is None else retries)
+        yield conn
 
 def init_db():
     with get_conn() as conn:
@@ -45,8 +399,155 @@ def init_db():
                 FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE
             );'''
         )
+        _migrate(conn)
+        _ensure_product_fts(conn)
         conn.commit()
 
+# Local time in the same ISO form sales.py writes for sales.ts
+_NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')"
+
+# Schema upgrades applied in order on top of the base tables; PRAGMA
+# user_version records how many have run against a given database file.
+MIGRATIONS = [
+    # 1: range-friendly indexes for date-filtered sales queries
+    [
+        "CREATE INDEX IF NOT EXISTS idx_sales_ts ON sales(ts);",
+        "CREATE INDEX IF NOT EXISTS idx_sales_product_ts ON sales(product_id, ts);",
+    ],
+    # 2: keyset pagination of the product list by name
+    [
+        "CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);",
+    ],
+    # 3: per-day, per-product sales rollup maintained by triggers
+    [
+        """CREATE TABLE IF NOT EXISTS sales_daily(
+            day TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            orders INTEGER NOT NULL,
+            qty INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY(day, product_id)
+        ) WITHOUT ROWID;""",
+        """CREATE TRIGGER IF NOT EXISTS sales_daily_ai AFTER INSERT ON sales BEGIN
+            INSERT INTO sales_daily(day, product_id, orders, qty, revenue)
+            VALUES (substr(new.ts, 1, 10), new.product_id, 1, new.quantity, new.total)
+            ON CONFLICT(day, product_id) DO UPDATE SET
+                orders = orders + 1, qty = qty + excluded.qty, revenue = revenue + excluded.revenue;
+        END;""",
+        """CREATE TRIGGER IF NOT EXISTS sales_daily_ad AFTER DELETE ON sales BEGIN
+            UPDATE sales_daily SET orders = orders - 1, qty = qty - old.quantity, revenue = revenue - old.total
+            WHERE day = substr(old.ts, 1, 10) AND product_id = old.product_id;
+            DELETE FROM sales_daily
+            WHERE day = substr(old.ts, 1, 10) AND product_id = old.product_id AND orders <= 0;
+        END;""",
+        """CREATE TRIGGER IF NOT EXISTS sales_daily_au AFTER UPDATE OF product_id, quantity, total, ts ON sales BEGIN
+            UPDATE sales_daily SET orders = orders - 1, qty = qty - old.quantity, revenue = revenue - old.total
+            WHERE day = substr(old.ts, 1, 10) AND product_id = old.product_id;
+            DELETE FROM sales_daily
+            WHERE day = substr(old.ts, 1, 10) AND product_id = old.product_id AND orders <= 0;
+            INSERT INTO sales_daily(day, product_id, orders, qty, revenue)
+            VALUES (substr(new.ts, 1, 10), new.product_id, 1, new.quantity, new.total)
+            ON CONFLICT(day, product_id) DO UPDATE SET
+                orders = orders + 1, qty = qty + excluded.qty, revenue = revenue + excluded.revenue;
+        END;""",
+        """INSERT OR REPLACE INTO sales_daily(day, product_id, orders, qty, revenue)
+            SELECT substr(ts, 1, 10), product_id, COUNT(*), SUM(quantity), SUM(total)
+            FROM sales GROUP BY substr(ts, 1, 10), product_id;""",
+    ],
+    # 4: low-stock lookups: by absolute quantity, and a partial index holding
+    # only the products at or below their own reorder level
+    [
+        "CREATE INDEX IF NOT EXISTS idx_products_quantity ON products(quantity);",
+        """CREATE INDEX IF NOT EXISTS idx_products_below_reorder ON products(quantity)
+            WHERE quantity <= reorder_level;""",
+    ],
+    # 5: change tracking for delta exports. Every product insert, real update
+    # or delete takes the next value of change_seq('products'); deletes leave
+    # a tombstone. Sales are append-only, so their id is the high-water mark.
+    [
+        """CREATE TABLE IF NOT EXISTS change_seq(
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID;""",
+        "ALTER TABLE products ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0;",
+        "ALTER TABLE products ADD COLUMN updated_at TEXT;",
+        f"UPDATE products SET row_version = id, updated_at = {_NOW_SQL};",
+        "INSERT OR REPLACE INTO change_seq(name, value) SELECT 'products', COALESCE(MAX(id), 0) FROM products;",
+        "CREATE INDEX IF NOT EXISTS idx_products_row_version ON products(row_version);",
+        """CREATE TABLE IF NOT EXISTS products_deleted(
+            id INTEGER PRIMARY KEY,
+            sku TEXT NOT NULL,
+            row_version INTEGER NOT NULL,
+            deleted_at TEXT NOT NULL
+        );""",
+        "CREATE INDEX IF NOT EXISTS idx_products_deleted_version ON products_deleted(row_version);",
+        f"""CREATE TRIGGER IF NOT EXISTS products_version_ai AFTER INSERT ON products BEGIN
+            UPDATE change_seq SET value = value + 1 WHERE name = 'products';
+            UPDATE products SET row_version = (SELECT value FROM change_seq WHERE name = 'products'),
+                updated_at = {_NOW_SQL} WHERE id = new.id;
+        END;""",
+        # no-op upserts (e.g. re-importing the same catalog) keep their version
+        f"""CREATE TRIGGER IF NOT EXISTS products_version_au
+            AFTER UPDATE OF name, sku, price, quantity, reorder_level ON products
+            WHEN old.name IS NOT new.name OR old.sku IS NOT new.sku OR old.price IS NOT new.price
+                OR old.quantity IS NOT new.quantity OR old.reorder_level IS NOT new.reorder_level
+        BEGIN
+            UPDATE change_seq SET value = value + 1 WHERE name = 'products';
+            UPDATE products SET row_version = (SELECT value FROM change_seq WHERE name = 'products'),
+                updated_at = {_NOW_SQL} WHERE id = new.id;
+        END;""",
+        f"""CREATE TRIGGER IF NOT EXISTS products_version_ad AFTER DELETE ON products BEGIN
+            UPDATE change_seq SET value = value + 1 WHERE name = 'products';
+            INSERT OR REPLACE INTO products_deleted(id, sku, row_version, deleted_at)
+            VALUES (old.id, old.sku, (SELECT value FROM change_seq WHERE name = 'products'), {_NOW_SQL});
+        END;""",
+        """CREATE TABLE IF NOT EXISTS export_cursors(
+            target TEXT NOT NULL,
+            source TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY(target, source)
+        ) WITHOUT ROWID;""",
+    ],
+]
+
+def _migrate(conn):
+    version = conn.execute("PRAGMA user_version;").fetchone()[0]
+    for i, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        for stmt in statements:
+            conn.execute(stmt)
+        conn.execute(f"PRAGMA user_version = {i};")
+
+def has_table(conn, name: str) -> bool:
+    cur = conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (name,))
+    return cur.fetchone() is not None
+
+def _ensure_product_fts(conn):
+    """Full-text index over product name/sku, kept in sync by triggers.
+
+    Skipped silently when this SQLite build lacks FTS5; inventory falls back
+    to LIKE searches in that case.
+    """
+    if has_table(conn, "products_fts"):
+        return
+    try:
+        conn.execute("""CREATE VIRTUAL TABLE products_fts USING fts5(
+                            name, sku, content='products', content_rowid='id',
+                            tokenize='unicode61', prefix='2 3');""")
+    except sqlite3.OperationalError:
+        return
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+                        INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+                    END;""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+                        INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+                    END;""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, sku ON products BEGIN
+                        INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+                        INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+                    END;""")
+    conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild');")
+
 def seed_admin_if_missing(username="admin", password="admin123"):
     from auth import create_user, get_user_by_username
     if get_user_by_username(username) is None:
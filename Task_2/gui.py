@@ -1,11 +1,94 @@
+import queue
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox, simpledialog
+import db
 from db import init_db, seed_admin_if_missing
-import auth, inventory, sales, reports
-from utils import is_non_negative_int, is_positive_float, is_positive_int
+import analytics, auth, inventory, sales, reports
+from utils import day_bounds, is_non_negative_int, is_positive_float, is_positive_int
+
+class TaskRunner:
+    """Runs blocking database calls on worker threads and hands results back to Tk.
+
+    Workers never touch widgets: finished futures are queued and drained by an
+    after() poll on the Tk thread, which then calls on_done/on_error. Tasks
+    submitted with the same `key` coalesce: a queued one that has not started
+    is cancelled and a stale one that is already running has its result
+    dropped, so only the latest refresh reaches the widgets.
+    """
+
+    POLL_MS = 30
+
+    def __init__(self, root, workers=4):
+        self.root = root
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-worker")
+        self._done = queue.SimpleQueue()
+        self._latest = {}
+        self._active = 0
+        self._busy_callbacks = []
+        self.root.after(self.POLL_MS, self._poll)
+
+    def on_busy(self, callback):
+        """Register callback(busy: bool), called when work starts or drains."""
+        self._busy_callbacks.append(callback)
+
+    def submit(self, fn, *args, key=None, on_done=None, on_error=None):
+        if key is not None:
+            prev = self._latest.get(key)
+            if prev is not None:
+                prev.cancel()
+        future = self._pool.submit(fn, *args)
+        if key is not None:
+            self._latest[key] = future
+        self._set_active(self._active + 1)
+        future.add_done_callback(lambda f: self._done.put((key, f, on_done, on_error)))
+        return future
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _set_active(self, n):
+        was_busy, self._active = self._active > 0, n
+        if was_busy != (n > 0):
+            for cb in self._busy_callbacks:
+                cb(n > 0)
+
+    def _poll(self):
+        while True:
+            try:
+                key, future, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._set_active(self._active - 1)
+            if future.cancelled():
+                continue
+            if key is not None:
+                if self._latest.get(key) is not future:
+                    continue
+                del self._latest[key]
+            try:
+                exc = future.exception()
+                if exc is not None:
+                    (on_error or _show_error)(exc)
+                elif on_done is not None:
+                    on_done(future.result())
+            except Exception as e:
+                # e.g. the target widget was destroyed meanwhile; keep polling
+                self.root.report_callback_exception(type(e), e, e.__traceback__)
+        try:
+            self.root.after(self.POLL_MS, self._poll)
+        except tk.TclError:
+            self.shutdown()  # root window destroyed
+
+def _show_error(exc):
+    messagebox.showerror("Error", str(exc))
+
+def run_task(widget, fn, *args, key=None, on_done=None, on_error=None):
+    """Submit fn(*args) to the TaskRunner of the widget's top-level window."""
+    return widget.winfo_toplevel().tasks.submit(fn, *args, key=key, on_done=on_done, on_error=on_error)
 
 class LoginFrame(ttk.Frame):
-    def __init__(self, master, on_success):
+    def __init__(self, master, on_success, ready=True):
         super().__init__(master, padding=24)
         self.on_success = on_success
         self.columnconfigure(1, weight=1)
@@ -21,15 +104,108 @@ class LoginFrame(ttk.Frame):
 
         self.login_btn = ttk.Button(self, text="Login", command=self.attempt_login)
         self.login_btn.grid(row=3, column=0, columnspan=2, pady=12, sticky="ew")
+        if not ready:
+            self.login_btn.config(text="Preparing...")
+            self.login_btn.state(["disabled"])
 
         self.username.focus_set()
 
+    def set_ready(self):
+        self.login_btn.config(text="Login")
+        self.login_btn.state(["!disabled"])
+
     def attempt_login(self):
         u, p = self.username.get().strip(), self.password.get()
-        if auth.validate_login(u, p):
-            self.on_success(u)
-        else:
-            messagebox.showerror("Login failed", "Invalid username or password.")
+        self.login_btn.state(["disabled"])
+
+        def done(ok):
+            if ok:
+                self.on_success(u)
+            else:
+                self.login_btn.state(["!disabled"])
+                messagebox.showerror("Login failed", "Invalid username or password.")
+
+        def failed(exc):
+            self.login_btn.state(["!disabled"])
+            _show_error(exc)
+
+        run_task(self, auth.validate_login, u, p, key="login", on_done=done, on_error=failed)
+
+class PagedTree(ttk.Frame):
+    """Treeview with a scrollbar that loads rows a page at a time.
+
+    fetch_page(after, limit) returns the next rows and cursor_of(row) gives
+    the `after` key for the page that follows that row. The next page is
+    fetched once the view is scrolled past `prefetch` of the loaded rows, so
+    only what the user actually scrolls to is ever queried.
+
+    At most about `max_rows` rows are kept. Past that, whole pages are dropped
+    from the top. Paging only runs forward, so dropped rows come back only
+    through reset().
+    """
+
+    def __init__(self, master, columns, widths, fetch_page, cursor_of,
+                 page_size=200, prefetch=0.8, height=12, max_rows=5000):
+        super().__init__(master)
+        self.fetch_page = fetch_page
+        self.cursor_of = cursor_of
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.max_rows = max_rows
+        self._cursor = None
+        self._exhausted = False
+        self._pending = False
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height)
+        for c, w in zip(columns, widths):
+            self.tree.heading(c, text=c.upper())
+            self.tree.column(c, width=w, anchor="center")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= self.prefetch and not self._exhausted and not self._pending:
+            self._pending = True
+            self.load_more()
+
+    def reset(self):
+        self.tree.delete(*self.tree.get_children())
+        self._cursor = None
+        self._exhausted = False
+        self._pending = True
+        self.load_more()
+
+    def load_more(self):
+        if self._exhausted:
+            self._pending = False
+            return
+        # keyed per widget: a reset() supersedes any page still in flight
+        run_task(self, self.fetch_page, self._cursor, self.page_size,
+                 key=("page", str(self)), on_done=self.add_rows)
+
+    def add_rows(self, rows):
+        self._pending = False
+        for r in rows:
+            self.tree.insert("", "end", values=r)
+        if rows:
+            self._cursor = self.cursor_of(rows[-1])
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        self._evict()
+
+    def _evict(self):
+        items = self.tree.get_children()
+        excess = len(items) - self.max_rows
+        if excess <= 0:
+            return
+        drop = -(-excess // self.page_size) * self.page_size  # whole pages
+        # keep the same rows in view once the ones above them are gone
+        first = float(self.tree.yview()[0]) * len(items)
+        self.tree.delete(*items[:drop])
+        self.tree.yview_moveto(max(0.0, first - drop) / max(1, len(items) - drop))
 
 class ProductsTab(ttk.Frame):
     def __init__(self, master):
@@ -45,11 +221,12 @@ class ProductsTab(ttk.Frame):
 
         # Treeview
         cols = ("id", "name", "sku", "price", "quantity", "reorder")
-        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=14)
-        for c, w in zip(cols, (50, 220, 120, 90, 90, 110)):
-            self.tree.heading(c, text=c.upper())
-            self.tree.column(c, width=w, anchor="center")
-        self.tree.pack(fill="both", expand=True, pady=8)
+        self._search = ""
+        self.pager = PagedTree(self, cols, (50, 220, 120, 90, 90, 110),
+                               fetch_page=lambda after, limit: inventory.list_products_page(self._search, after, limit),
+                               cursor_of=lambda r: (r[1], r[0]), height=14)
+        self.tree = self.pager.tree
+        self.pager.pack(fill="both", expand=True, pady=8)
 
         btns = ttk.Frame(self)
         btns.pack(fill="x")
@@ -66,11 +243,8 @@ class ProductsTab(ttk.Frame):
         return int(item["values"][0])
 
     def refresh(self):
-        for r in self.tree.get_children():
-            self.tree.delete(r)
-        rows = inventory.list_products(self.search_var.get().strip())
-        for r in rows:
-            self.tree.insert("", "end", values=r)
+        self._search = self.search_var.get().strip()
+        self.pager.reset()
 
     def add_dialog(self):
         ProductDialog(self, title="Add Product", on_submit=self._add_submit)
@@ -80,33 +254,29 @@ class ProductsTab(ttk.Frame):
         if not name or not sku or not is_positive_float(price) or not is_non_negative_int(qty) or not is_non_negative_int(reorder):
             messagebox.showerror("Invalid", "Please enter valid product details.")
             return
-        try:
-            inventory.add_product(name, sku, float(price), int(qty), int(reorder))
-            self.refresh()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        run_task(self, inventory.add_product, name, sku, float(price), int(qty), int(reorder),
+                 on_done=lambda _: self.refresh())
 
     def edit_dialog(self):
         pid = self.selected_id()
         if not pid:
             messagebox.showinfo("Select", "Please select a product to edit.")
             return
-        p = inventory.get_product(pid)
-        if not p:
-            messagebox.showerror("Error", "Product not found.")
-            return
-        ProductDialog(self, title="Edit Product", init_values=p, on_submit=lambda d: self._edit_submit(pid, d))
+        def show(p):
+            if not p:
+                messagebox.showerror("Error", "Product not found.")
+                return
+            ProductDialog(self, title="Edit Product", init_values=p, on_submit=lambda d: self._edit_submit(pid, d))
+
+        run_task(self, inventory.get_product, pid, on_done=show)
 
     def _edit_submit(self, pid, data):
         name, sku, price, qty, reorder = data
         if not name or not sku or not is_positive_float(price) or not is_non_negative_int(qty) or not is_non_negative_int(reorder):
             messagebox.showerror("Invalid", "Please enter valid product details.")
             return
-        try:
-            inventory.update_product(pid, name, sku, float(price), int(qty), int(reorder))
-            self.refresh()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        run_task(self, inventory.update_product, pid, name, sku, float(price), int(qty), int(reorder),
+                 on_done=lambda _: self.refresh())
 
     def delete_selected(self):
         pid = self.selected_id()
@@ -114,11 +284,7 @@ class ProductsTab(ttk.Frame):
             messagebox.showinfo("Select", "Please select a product to delete.")
             return
         if messagebox.askyesno("Confirm", "Delete selected product? This cannot be undone."):
-            try:
-                inventory.delete_product(pid)
-                self.refresh()
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+            run_task(self, inventory.delete_product, pid, on_done=lambda _: self.refresh())
 
 class ProductDialog(tk.Toplevel):
     def __init__(self, master, title="Product", init_values=None, on_submit=None):
@@ -183,10 +349,10 @@ class SalesTab(ttk.Frame):
         top = ttk.Frame(self)
         top.pack(fill="x")
         ttk.Label(top, text="Product").pack(side="left")
-        self.products = inventory.list_products()
-        self.product_map = {f"{p[1]} ({p[2]})": p for p in self.products}
+        self.products = []
+        self.product_map = {}
         self.prod_var = tk.StringVar()
-        self.prod_cb = ttk.Combobox(top, textvariable=self.prod_var, values=list(self.product_map.keys()), state="readonly", width=40)
+        self.prod_cb = ttk.Combobox(top, textvariable=self.prod_var, values=[], state="readonly", width=40)
         self.prod_cb.pack(side="left", padx=8)
 
         ttk.Label(top, text="Qty").pack(side="left")
@@ -198,19 +364,39 @@ class SalesTab(ttk.Frame):
         ttk.Entry(top, textvariable=self.price_var, width=10).pack(side="left", padx=4)
 
         ttk.Button(top, text="Record Sale", command=self.record_sale).pack(side="left", padx=8)
+        ttk.Button(top, text="Add to Basket", command=self.add_to_basket).pack(side="left")
+
+        # Basket
+        bf = ttk.LabelFrame(self, text="Basket")
+        bf.pack(fill="x", pady=(8, 0))
+        bcols = ("product", "qty", "unit_price", "total")
+        self.basket = []
+        self.basket_tree = ttk.Treeview(bf, columns=bcols, show="headings", height=4)
+        for c, w in zip(bcols, (300, 80, 100, 100)):
+            self.basket_tree.heading(c, text=c.upper())
+            self.basket_tree.column(c, width=w, anchor="center")
+        self.basket_tree.pack(side="left", fill="x", expand=True)
+        bbtns = ttk.Frame(bf)
+        bbtns.pack(side="left", padx=6)
+        ttk.Button(bbtns, text="Checkout", command=self.checkout_basket).pack(fill="x")
+        ttk.Button(bbtns, text="Clear", command=self.clear_basket).pack(fill="x", pady=4)
 
         # Sales list
         cols = ("id", "product", "qty", "unit_price", "total", "ts")
-        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=12)
-        for c, w in zip(cols, (60, 240, 80, 100, 100, 150)):
-            self.tree.heading(c, text=c.upper())
-            self.tree.column(c, width=w, anchor="center")
-        self.tree.pack(fill="both", expand=True, pady=8)
+        self.pager = PagedTree(self, cols, (60, 240, 80, 100, 100, 150),
+                               fetch_page=lambda after, limit: sales.list_sales_page(after=after, limit=limit),
+                               cursor_of=lambda r: (r[5], r[0]), height=12)
+        self.tree = self.pager.tree
+        self.pager.pack(fill="both", expand=True, pady=8)
 
+        self.refresh_products()
         self.refresh_sales()
 
     def refresh_products(self):
-        self.products = inventory.list_products()
+        run_task(self, inventory.list_products, key=("products", str(self)), on_done=self._set_products)
+
+    def _set_products(self, products):
+        self.products = products
         self.product_map = {f"{p[1]} ({p[2]})": p for p in self.products}
         self.prod_cb["values"] = list(self.product_map.keys())
 
@@ -225,18 +411,45 @@ class SalesTab(ttk.Frame):
             messagebox.showerror("Invalid", "Enter valid quantity (>0) and unit price (>=0).")
             return
         pid = self.product_map[key][0]
-        try:
-            sale_id = sales.record_sale(pid, int(qty), float(price))
+
+        def done(sale_id):
             messagebox.showinfo("Success", f"Sale recorded (ID: {sale_id}).")
             self.refresh_sales()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+
+        run_task(self, sales.record_sale, pid, int(qty), float(price), on_done=done)
+
+    def add_to_basket(self):
+        key = self.prod_var.get()
+        if key not in self.product_map:
+            messagebox.showerror("Select", "Select a valid product.")
+            return
+        qty = self.qty_var.get().strip()
+        price = self.price_var.get().strip()
+        if not is_positive_int(qty) or not is_positive_float(price):
+            messagebox.showerror("Invalid", "Enter valid quantity (>0) and unit price (>=0).")
+            return
+        qty, price = int(qty), float(price)
+        self.basket.append((self.product_map[key][0], qty, price))
+        self.basket_tree.insert("", "end", values=(key, qty, price, round(qty * price, 2)))
+
+    def clear_basket(self):
+        self.basket = []
+        for r in self.basket_tree.get_children():
+            self.basket_tree.delete(r)
+
+    def checkout_basket(self):
+        if not self.basket:
+            messagebox.showinfo("Basket", "The basket is empty.")
+            return
+        def done(sale_ids):
+            messagebox.showinfo("Success", f"{len(sale_ids)} sale(s) recorded (IDs: {sale_ids[0]}-{sale_ids[-1]}).")
+            self.clear_basket()
+            self.refresh_sales()
+
+        run_task(self, sales.record_sales_batch, list(self.basket), on_done=done)
 
     def refresh_sales(self):
-        for r in self.tree.get_children():
-            self.tree.delete(r)
-        for s in sales.list_sales():
-            self.tree.insert("", "end", values=s)
+        self.pager.reset()
 
 class ReportsTab(ttk.Frame):
     def __init__(self, master):
@@ -249,11 +462,14 @@ class ReportsTab(ttk.Frame):
         ttk.Label(lf, text="Threshold").pack(side="left", padx=4)
         ttk.Entry(lf, textvariable=self.threshold_var, width=6).pack(side="left")
         ttk.Button(lf, text="Check", command=self.refresh_low_stock).pack(side="left", padx=6)
-        self.low_tree = ttk.Treeview(self, columns=("id","name","sku","qty","reorder"), show="headings", height=6)
-        for c, w in zip(("id","name","sku","qty","reorder"), (50, 220, 120, 80, 100)):
-            self.low_tree.heading(c, text=c.upper())
-            self.low_tree.column(c, width=w, anchor="center")
-        self.low_tree.pack(fill="x", pady=6)
+        self.low_count_lbl = ttk.Label(lf, text="")
+        self.low_count_lbl.pack(side="left", padx=6)
+        self._threshold = 5
+        self.low_pager = PagedTree(self, ("id","name","sku","qty","reorder"), (50, 220, 120, 80, 100),
+                                   fetch_page=lambda after, limit: reports.low_stock_page(self._threshold, after, limit),
+                                   cursor_of=lambda r: (r[3], r[0]), page_size=reports.LOW_STOCK_PAGE, height=6)
+        self.low_tree = self.low_pager.tree
+        self.low_pager.pack(fill="x", pady=6)
 
         # Sales summary
         sf = ttk.LabelFrame(self, text="Sales Summary")
@@ -275,8 +491,37 @@ class ReportsTab(ttk.Frame):
         ttk.Button(ef, text="Export Inventory CSV", command=self.export_inventory).pack(side="left", padx=6)
         ttk.Button(ef, text="Export Sales CSV", command=self.export_sales).pack(side="left", padx=6)
 
+        # Sales analytics
+        af = ttk.LabelFrame(self, text="Sales Analytics")
+        af.pack(fill="both", expand=True, pady=8)
+        abar = ttk.Frame(af)
+        abar.pack(fill="x")
+        ttk.Label(abar, text="Top sellers over").pack(side="left", padx=4)
+        self.window_var = tk.StringVar(value=str(analytics.WINDOWS[0]))
+        window_cb = ttk.Combobox(abar, textvariable=self.window_var, values=[str(w) for w in analytics.WINDOWS],
+                                 state="readonly", width=4)
+        window_cb.pack(side="left")
+        window_cb.bind("<<ComboboxSelected>>", lambda _: self._show_top())
+        ttk.Label(abar, text="days").pack(side="left", padx=4)
+        ttk.Button(abar, text="Analyze", command=self.refresh_analytics).pack(side="left", padx=6)
+        self.analytics_lbl = ttk.Label(abar, text="")
+        self.analytics_lbl.pack(side="left", padx=6)
+        self._forecast = None
+        self.top_tree = self._tree(af, ("id", "name", "sku", "units"), (50, 220, 120, 80))
+        self.reorder_tree = self._tree(af, ("id", "name", "sku", "qty", "per_day", "cover_days", "order"),
+                                       (50, 220, 120, 70, 80, 90, 80))
+
         self.refresh_low_stock()
 
+    @staticmethod
+    def _tree(master, cols, widths):
+        tree = ttk.Treeview(master, columns=cols, show="headings", height=5)
+        for c, w in zip(cols, widths):
+            tree.heading(c, text=c.upper())
+            tree.column(c, width=w, anchor="center")
+        tree.pack(fill="x", pady=4)
+        return tree
+
     def refresh_low_stock(self):
         thr = self.threshold_var.get().strip()
         try:
@@ -284,28 +529,56 @@ class ReportsTab(ttk.Frame):
         except:
             messagebox.showerror("Invalid", "Threshold must be an integer.")
             return
-        for r in self.low_tree.get_children():
-            self.low_tree.delete(r)
-        for row in reports.low_stock(thr):
-            # row: (id, name, sku, quantity, reorder_level)
-            self.low_tree.insert("", "end", values=(row[0], row[1], row[2], row[3], row[4]))
+        self._threshold = thr
+        self.low_pager.reset()
+        run_task(self, reports.low_stock_count, thr, key=("low_stock_count", str(self)),
+                 on_done=lambda n: self.low_count_lbl.config(text=f"{n} product(s) low on stock"))
 
     def refresh_summary(self):
         f, t = self.from_var.get().strip() or None, self.to_var.get().strip() or None
         try:
-            total_orders, total_qty, total_revenue = reports.sales_summary(f, t)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+            day_bounds(f, t)
+        except ValueError:
+            messagebox.showerror("Invalid", "Dates must be YYYY-MM-DD.")
+            return
+        def show(summary):
+            total_orders, total_qty, total_revenue = summary
+            self.summary_lbl.config(text=f"Total Orders: {total_orders} | Total Qty: {total_qty} | Revenue: {round(total_revenue,2)}")
+
+        def failed(exc):
+            self.summary_lbl.config(text="")
+            _show_error(exc)
+
+        self.summary_lbl.config(text="Calculating...")
+        run_task(self, reports.sales_summary, f, t, key=("summary", str(self)), on_done=show, on_error=failed)
+
+    def refresh_analytics(self):
+        self.analytics_lbl.config(text="Calculating...")
+        run_task(self, analytics.forecast, key=("analytics", str(self)), on_done=self._show_forecast)
+
+    def _show_forecast(self, result):
+        self._forecast = result
+        self.analytics_lbl.config(text=f"As of {result['as_of']}: {result['products']} products, "
+                                       f"{result['reorder_total']} to reorder")
+        self._show_top()
+        self.reorder_tree.delete(*self.reorder_tree.get_children())
+        for row in result["reorder"]:
+            self.reorder_tree.insert("", "end", values=row)
+
+    def _show_top(self):
+        if self._forecast is None:
             return
-        self.summary_lbl.config(text=f"Total Orders: {total_orders} | Total Qty: {total_qty} | Revenue: {round(total_revenue,2)}")
+        self.top_tree.delete(*self.top_tree.get_children())
+        for row in self._forecast["top"].get(int(self.window_var.get()), []):
+            self.top_tree.insert("", "end", values=row)
 
     def export_inventory(self):
-        path = reports.export_inventory_csv()
-        messagebox.showinfo("Exported", f"Inventory CSV exported to:\n{path}")
+        run_task(self, reports.export_inventory_csv, key="export_inventory",
+                 on_done=lambda path: messagebox.showinfo("Exported", f"Inventory CSV exported to:\n{path}"))
 
     def export_sales(self):
-        path = reports.export_sales_csv()
-        messagebox.showinfo("Exported", f"Sales CSV exported to:\n{path}")
+        run_task(self, reports.export_sales_csv, key="export_sales",
+                 on_done=lambda path: messagebox.showinfo("Exported", f"Sales CSV exported to:\n{path}"))
 
 class UsersTab(ttk.Frame):
     def __init__(self, master):
@@ -333,9 +606,12 @@ class UsersTab(ttk.Frame):
         return int(item["values"][0])
 
     def refresh(self):
+        run_task(self, auth.list_users, key=("users", str(self)), on_done=self._show_users)
+
+    def _show_users(self, users):
         for r in self.tree.get_children():
             self.tree.delete(r)
-        for uid, username, role in auth.list_users():
+        for uid, username, role in users:
             self.tree.insert("", "end", values=(uid, username, role))
 
     def add_user(self):
@@ -343,11 +619,7 @@ class UsersTab(ttk.Frame):
         if not u: return
         p = simpledialog.askstring("Add User", "Enter password:", show="*")
         if not p: return
-        try:
-            auth.create_user(u, p, role="admin")
-            self.refresh()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        run_task(self, auth.create_user, u, p, "admin", on_done=lambda _: self.refresh())
 
     def change_password(self):
         uid = self.selected_id()
@@ -356,11 +628,8 @@ class UsersTab(ttk.Frame):
             return
         p = simpledialog.askstring("Change Password", "Enter new password:", show="*")
         if not p: return
-        try:
-            auth.change_password(uid, p)
-            messagebox.showinfo("Success", "Password updated.")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        run_task(self, auth.change_password, uid, p,
+                 on_done=lambda _: messagebox.showinfo("Success", "Password updated."))
 
     def delete_user(self):
         uid = self.selected_id()
@@ -368,17 +637,27 @@ class UsersTab(ttk.Frame):
             messagebox.showinfo("Select", "Select a user to delete.")
             return
         if messagebox.askyesno("Confirm", "Delete selected user?"):
-            try:
-                auth.delete_user(uid)
-                self.refresh()
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+            run_task(self, auth.delete_user, uid, on_done=lambda _: self.refresh())
 
 class MainApp(tk.Tk):
     def __init__(self, username):
         super().__init__()
         self.title(f"Inventory Management - Logged in as {username}")
         self.geometry("860x600")
+        self.tasks = TaskRunner(self)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Status bar, shown busy while any database task is in flight
+        status = ttk.Frame(self, padding=(8, 2))
+        status.pack(side="bottom", fill="x")
+        self.status_lbl = ttk.Label(status, text="Ready")
+        self.status_lbl.pack(side="left")
+        self.busy_bar = ttk.Progressbar(status, mode="indeterminate", length=120)
+        self.busy_bar.pack(side="right")
+        self.tasks.on_busy(self._set_busy)
+        # hidden diagnostics: SQL timing report
+        self.bind_all("<Control-Shift-P>", lambda e: self.show_sql_profile())
+
         nb = ttk.Notebook(self)
         self.products_tab = ProductsTab(nb)
         nb.add(self.products_tab, text="Products")
@@ -390,24 +669,64 @@ class MainApp(tk.Tk):
         nb.add(self.users_tab, text="Users")
         nb.pack(fill="both", expand=True)
 
+    def _set_busy(self, busy):
+        if busy:
+            self.status_lbl.config(text="Working...")
+            self.busy_bar.start(12)
+            self.config(cursor="watch")
+        else:
+            self.status_lbl.config(text="Ready")
+            self.busy_bar.stop()
+            self.config(cursor="")
+
+    def close(self):
+        self.tasks.shutdown()
+        self.destroy()
+
+    def show_sql_profile(self):
+        win = tk.Toplevel(self)
+        win.title("SQL profile")
+        text = tk.Text(win, width=140, height=40, font=("Courier", 9), wrap="none")
+        text.insert("1.0", db.profile_report() + "\n\npool: " + str(db.pool_stats()))
+        text.config(state="disabled")
+        text.pack(fill="both", expand=True)
+
+def _prepare_auth():
+    auth.calibrate_hashing()
+    seed_admin_if_missing()
+
 class RootApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Inventory Management System")
+        self.tasks = TaskRunner(self)
         init_db()
-        seed_admin_if_missing()
+        # KDF calibration and the first admin hash take a few hundred ms; the
+        # login button waits for them, or the first admin login would fail
+        self.auth_ready = False
+        self.tasks.submit(_prepare_auth, key="prepare-auth",
+                          on_done=self._auth_prepared, on_error=self._auth_prepared)
         self.show_login()
 
+    def _auth_prepared(self, result):
+        if isinstance(result, Exception):
+            _show_error(result)  # existing users can still log in
+        self.auth_ready = True
+        for w in self.winfo_children():
+            if isinstance(w, LoginFrame):
+                w.set_ready()
+
     def show_login(self):
         for w in self.winfo_children():
             w.destroy()
-        lf = LoginFrame(self, on_success=self.launch_main)
+        lf = LoginFrame(self, on_success=self.launch_main, ready=self.auth_ready)
         lf.pack(fill="both", expand=True)
 
     def launch_main(self, username):
         for w in self.winfo_children():
             w.destroy()
         # Reuse this same window for main UI
+        self.tasks.shutdown()
         self.destroy()  # close login window
         app = MainApp(username)
         app.mainloop()
@@ -0,0 +1,33 @@
+"""Bulk-load products from CSV or JSONL, upserting on SKU.
+
+    python import_products.py catalog.csv [--chunk 5000] [--errors rejects.jsonl]
+
+CSV files need a header row with name, sku, price, quantity and optionally
+reorder_level; JSONL files hold one object per line with the same keys.
+"""
+import argparse
+import sys
+
+from db import init_db
+import inventory
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("file")
+    ap.add_argument("--chunk", type=int, default=inventory.IMPORT_CHUNK, help="rows per transaction")
+    ap.add_argument("--errors", help="where to write rejected rows (JSONL)")
+    args = ap.parse_args(argv)
+
+    init_db()
+    stats = inventory.import_products(
+        args.file, chunk_size=args.chunk, error_path=args.errors,
+        progress=lambda n: print(f"\r{n} rows read", end="", file=sys.stderr, flush=True))
+    print(file=sys.stderr)
+    print(f"read={stats['read']} imported={stats['imported']} rejected={stats['rejected']} "
+          f"in {stats['seconds']}s ({stats['rows_per_sec']} rows/s)")
+    if stats["error_file"]:
+        print(f"rejected rows written to {stats['error_file']}")
+    return 0 if not stats["rejected"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
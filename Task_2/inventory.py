@@ -1,5 +1,165 @@
-from db import get_conn
-from typing import Optional, List, Tuple
+import archive
+from db import connect_unpooled, get_conn, get_pool, has_table, write_transaction
+from utils import is_non_negative_int, is_positive_float
+from typing import Callable, Iterator, Optional, List, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import csv
+import json
+import threading
+import time
+
+CATALOG_CACHE_SIZE = 50000
+CATALOG_POLL_SECONDS = 0.2  # how stale another process's writes may look
+
+class CatalogCache:
+    """Bounded LRU of product rows by id, with a sku -> id index.
+
+    Writers in this module (and sales) call invalidate() after committing.
+    Writes from other processes are caught by polling, at most every
+    `poll_interval` seconds, for products whose row_version moved past the
+    last one seen (plus new tombstones); only those rows are dropped. A
+    generation counter stops a read that raced with a write from caching the
+    old row.
+    """
+
+    def __init__(self, max_size: int = CATALOG_CACHE_SIZE, poll_interval: float = CATALOG_POLL_SECONDS):
+        self.max_size = max_size
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._rows = OrderedDict()
+        self._sku = {}
+        self._all = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._watch = None
+        self._seen_version = None
+        self._next_poll = 0.0
+
+    def _check_external(self):
+        # caller holds the lock
+        now = time.monotonic()
+        pool = get_pool()
+        if pool is self._pool and now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_interval
+        if pool is not self._pool:
+            if self._watch is not None:
+                self._watch.close()
+            self._pool, self._watch, self._seen_version = pool, connect_unpooled(), None
+        # the high-water mark is read first, so a change committed while the
+        # ids are fetched is picked up by the next poll instead of skipped
+        row = self._watch.execute("SELECT value FROM change_seq WHERE name='products'").fetchone()
+        version = row[0] if row else 0
+        if self._seen_version is None:
+            self._clear()
+        elif version != self._seen_version:
+            changed = self._watch.execute(
+                """SELECT id FROM products WHERE row_version > ? AND row_version <= ?
+                   UNION ALL
+                   SELECT id FROM products_deleted WHERE row_version > ? AND row_version <= ?""",
+                (self._seen_version, version, self._seen_version, version)).fetchall()
+            for (pid,) in changed:
+                self._drop(pid)
+            self._all = None
+            self._generation += 1
+        self._seen_version = version
+
+    def _clear(self):
+        self._rows.clear()
+        self._sku.clear()
+        self._all = None
+        self._generation += 1
+
+    def lookup(self, product_id: int):
+        """Return (found, row, generation); `generation` is passed back to store()."""
+        with self._lock:
+            self._check_external()
+            row = self._rows.get(product_id)
+            if row is not None:
+                self._rows.move_to_end(product_id)
+                self.hits += 1
+                return True, row, self._generation
+            self.misses += 1
+            return False, None, self._generation
+
+    def lookup_sku(self, sku: str):
+        with self._lock:
+            self._check_external()
+            pid = self._sku.get(sku)
+            row = self._rows.get(pid) if pid is not None else None
+            if row is not None:
+                self._rows.move_to_end(pid)
+                self.hits += 1
+                return True, row, self._generation
+            self.misses += 1
+            return False, None, self._generation
+
+    def store(self, row: Tuple, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._rows[row[0]] = row
+            self._rows.move_to_end(row[0])
+            self._sku[row[2]] = row[0]
+            while len(self._rows) > self.max_size:
+                _, old = self._rows.popitem(last=False)
+                self._sku.pop(old[2], None)
+                self.evictions += 1
+
+    def lookup_all(self):
+        with self._lock:
+            self._check_external()
+            if self._all is not None:
+                self.hits += 1
+                return True, list(self._all), self._generation
+            self.misses += 1
+            return False, None, self._generation
+
+    def store_all(self, rows: List[Tuple], generation: int):
+        if len(rows) > self.max_size:
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._all = list(rows)
+
+    def invalidate(self, product_id: int = None):
+        """Drop one product (or everything when product_id is None)."""
+        with self._lock:
+            self.invalidations += 1
+            if product_id is None:
+                self._clear()
+                return
+            self._drop(product_id)
+            self._all = None
+            self._generation += 1
+
+    def _drop(self, product_id: int):
+        row = self._rows.pop(product_id, None)
+        if row is not None:
+            self._sku.pop(row[2], None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._rows), "max_size": self.max_size, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations}
+
+catalog_cache = CatalogCache()
+
+def invalidate_products(*product_ids: int) -> None:
+    """Drop cached rows after changing them outside this module (e.g. sales)."""
+    if not product_ids:
+        catalog_cache.invalidate()
+    for pid in product_ids:
+        catalog_cache.invalidate(pid)
+
+def catalog_cache_stats() -> dict:
+    return catalog_cache.stats()
 
 def add_product(name: str, sku: str, price: float, quantity: int, reorder_level: int = 5) -> int:
     with get_conn() as conn:
@@ -7,28 +167,62 @@ def add_product(name: str, sku: str, price: float, quantity: int, reorder_level:
         cur.execute("""INSERT INTO products(name, sku, price, quantity, reorder_level)
                     VALUES(?,?,?,?,?)""", (name, sku, price, quantity, reorder_level))
         conn.commit()
-        return cur.lastrowid
+    catalog_cache.invalidate(cur.lastrowid)
+    return cur.lastrowid
 
-def update_product(product_id: int, name: str, sku: str, price: float, quantity: int, reorder_level: int) -> None:
+def update_product(product_id: int, name: str, sku: str, price: float, quantity: int, reorder_level: int) -> bool:
+    """Returns False if there is no such product."""
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute("""UPDATE products SET name=?, sku=?, price=?, quantity=?, reorder_level=?
                     WHERE id=?""", (name, sku, price, quantity, reorder_level, product_id))
         conn.commit()
+    catalog_cache.invalidate(product_id)
+    return cur.rowcount > 0
 
-def delete_product(product_id: int) -> None:
+def delete_product(product_id: int) -> bool:
+    """Returns False if there is no such product."""
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute("DELETE FROM products WHERE id=?", (product_id,))
+        found = cur.rowcount > 0
+        # the cascade and its trigger took the rollup rows of main sales; what
+        # is left belongs to archived sales, which are purged below
+        cur.execute("DELETE FROM sales_daily WHERE product_id=?", (product_id,))
         conn.commit()
+    archive.purge_product(product_id)
+    catalog_cache.invalidate(product_id)
+    return found
 
 def get_product(product_id: int) -> Optional[Tuple]:
+    found, row, generation = catalog_cache.lookup(product_id)
+    if found:
+        return row
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute("SELECT id, name, sku, price, quantity, reorder_level FROM products WHERE id=?", (product_id,))
-        return cur.fetchone()
+        row = cur.fetchone()
+    if row is not None:
+        catalog_cache.store(row, generation)
+    return row
+
+def get_product_by_sku(sku: str) -> Optional[Tuple]:
+    found, row, generation = catalog_cache.lookup_sku(sku)
+    if found:
+        return row
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, name, sku, price, quantity, reorder_level FROM products WHERE sku=?", (sku,))
+        row = cur.fetchone()
+    if row is not None:
+        catalog_cache.store(row, generation)
+    return row
 
 def list_products(search: str = "") -> List[Tuple]:
+    if not search:
+        found, rows, generation = catalog_cache.lookup_all()
+        if found:
+            return rows
     q = "%" + search + "%"
     with get_conn() as conn:
         cur = conn.cursor()
@@ -36,18 +230,178 @@ def list_products(search: str = "") -> List[Tuple]:
                     FROM products
                     WHERE name LIKE ? OR sku LIKE ?
                     ORDER BY name""", (q, q))
+        rows = cur.fetchall()
+    if not search:
+        catalog_cache.store_all(rows, generation)
+    return rows
+
+SEARCH_LIMIT = 50
+
+def _fts_query(search: str) -> str:
+    # every word must match as a prefix; quoting keeps FTS syntax out of user input
+    return " ".join('"' + tok.replace('"', '""') + '"*' for tok in search.split())
+
+def _search_clause(conn, search: str):
+    """WHERE fragment + params for a name/sku search (FTS5 if built, else LIKE)."""
+    if has_table(conn, "products_fts"):
+        return "id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)", [_fts_query(search)]
+    q = "%" + search + "%"
+    return "(name LIKE ? OR sku LIKE ?)", [q, q]
+
+def search_products(search: str, limit: int = SEARCH_LIMIT) -> List[Tuple]:
+    """Prefix search over name and sku, best matches first.
+
+    Uses the products_fts index (name hits weigh more than sku hits) and falls
+    back to a LIKE scan when SQLite was built without FTS5.
+    """
+    search = search.strip()
+    if not search:
+        return []
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if has_table(conn, "products_fts"):
+            cur.execute("""SELECT p.id, p.name, p.sku, p.price, p.quantity, p.reorder_level
+                        FROM products_fts f JOIN products p ON p.id = f.rowid
+                        WHERE products_fts MATCH ?
+                        ORDER BY bm25(products_fts, 2.0, 1.0)
+                        LIMIT ?""", (_fts_query(search), limit))
+        else:
+            where, params = _search_clause(conn, search)
+            cur.execute(f"""SELECT id, name, sku, price, quantity, reorder_level
+                        FROM products WHERE {where}
+                        ORDER BY name LIMIT ?""", params + [limit])
         return cur.fetchall()
 
-def adjust_stock(product_id: int, delta: int) -> None:
+PAGE_SIZE = 200
+
+def list_products_page(search: str = "", after: Tuple = None, limit: int = PAGE_SIZE) -> List[Tuple]:
+    """One page of list_products(); pass the (name, id) of the last row as `after`.
+
+    A non-empty `search` matches word prefixes through the full-text index
+    when available, otherwise substrings.
+    """
+    search = search.strip()
     with get_conn() as conn:
+        clauses, params = [], []
+        if search:
+            where, params = _search_clause(conn, search)
+            clauses.append(where)
+        if after is not None:
+            clauses.append("(name, id) > (?, ?)")
+            params.extend(after)
+        query = "SELECT id, name, sku, price, quantity, reorder_level FROM products"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY name, id LIMIT ?"
+        params.append(limit)
         cur = conn.cursor()
-        # Ensure not below zero
-        cur.execute("SELECT quantity FROM products WHERE id=?", (product_id,))
-        row = cur.fetchone()
-        if not row:
-            raise ValueError("Product not found")
-        new_q = row[0] + delta
-        if new_q < 0:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+def adjust_stock(product_id: int, delta: int) -> None:
+    with write_transaction() as conn:
+        cur = conn.cursor()
+        # Relative update that refuses to go below zero
+        cur.execute("UPDATE products SET quantity = quantity + ? WHERE id=? AND quantity + ? >= 0",
+                    (delta, product_id, delta))
+        if cur.rowcount == 0:
+            cur.execute("SELECT 1 FROM products WHERE id=?", (product_id,))
+            if cur.fetchone() is None:
+                raise ValueError("Product not found")
             raise ValueError("Insufficient stock")
-        cur.execute("UPDATE products SET quantity=? WHERE id=?", (new_q, product_id))
-        conn.commit()
+    catalog_cache.invalidate(product_id)
+
+IMPORT_FIELDS = ("name", "sku", "price", "quantity", "reorder_level")
+IMPORT_CHUNK = 5000
+
+_UPSERT = """INSERT INTO products(name, sku, price, quantity, reorder_level)
+             VALUES(?,?,?,?,?)
+             ON CONFLICT(sku) DO UPDATE SET
+                name=excluded.name, price=excluded.price,
+                quantity=excluded.quantity, reorder_level=excluded.reorder_level"""
+
+def _read_rows(path: Path) -> Iterator[Tuple[int, dict]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except ValueError as e:
+                        row = {"_error": f"bad JSON: {e}"}
+                    if not isinstance(row, dict):
+                        row = {"_error": "expected a JSON object"}
+                    if "_error" in row:
+                        row["_raw"] = line.rstrip("\n")
+                    yield line_no, row
+        else:
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+
+def _validate_row(row: dict) -> Tuple:
+    if "_error" in row:
+        raise ValueError(row["_error"])
+    name = str(row.get("name") or "").strip()
+    sku = str(row.get("sku") or "").strip()
+    price = str(row.get("price", "")).strip()
+    qty = str(row.get("quantity", "")).strip()
+    reorder = row.get("reorder_level")
+    reorder = "5" if reorder is None or str(reorder).strip() == "" else str(reorder).strip()
+    if not name or not sku:
+        raise ValueError("name and sku are required")
+    if not is_positive_float(price):
+        raise ValueError("price must be a number >= 0")
+    if not is_non_negative_int(qty) or not is_non_negative_int(reorder):
+        raise ValueError("quantity and reorder_level must be integers >= 0")
+    return name, sku, float(price), int(qty), int(reorder)
+
+def import_products(path, chunk_size: int = IMPORT_CHUNK, error_path=None,
+                    progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Stream products from a CSV or JSONL file and upsert them on sku.
+
+    Rows are validated with the utils validators and written in chunks of
+    `chunk_size`, one transaction per chunk. Rejected rows go to `error_path`
+    (JSONL, defaults to <file>.errors.jsonl) and `progress` is called with
+    the number of rows read after each chunk. Returns counts and rows/sec.
+    """
+    path = Path(path)
+    error_path = Path(error_path) if error_path else path.with_name(path.name + ".errors.jsonl")
+    stats = {"read": 0, "imported": 0, "rejected": 0}
+    started = time.perf_counter()
+    errors = None
+    chunk = []
+
+    def flush():
+        with write_transaction() as conn:
+            conn.executemany(_UPSERT, chunk)
+        stats["imported"] += len(chunk)
+        chunk.clear()
+        if progress:
+            progress(stats["read"])
+
+    try:
+        for line_no, row in _read_rows(path):
+            stats["read"] += 1
+            try:
+                chunk.append(_validate_row(row))
+            except ValueError as e:
+                if errors is None:
+                    errors = open(error_path, "w", encoding="utf-8")
+                errors.write(json.dumps({"line": line_no, "error": str(e),
+                                         "row": row.get("_raw", row)}) + "\n")
+                stats["rejected"] += 1
+                continue
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    finally:
+        if errors is not None:
+            errors.close()
+        if stats["imported"]:
+            catalog_cache.invalidate()
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["read"] / elapsed, 1) if elapsed else 0.0
+    stats["error_file"] = str(error_path) if stats["rejected"] else None
+    return stats
@@ -0,0 +1,67 @@
+"""Database maintenance commands.
+
+    python maintenance.py rebuild-rollup   # recompute sales_daily from raw sales
+    python maintenance.py check-rollup     # verify sales_daily against raw sales
+    python maintenance.py export-delta --target nightly   # changes since last run
+    python maintenance.py archive --before 2024-01-01      # move old sales out
+    python maintenance.py compact                           # VACUUM main + archive
+"""
+import argparse
+import sys
+
+from db import init_db
+import archive
+import reports
+
+def rebuild_rollup(args):
+    print(f"sales_daily rebuilt: {reports.rebuild_sales_daily()} rows")
+    return 0
+
+def check_rollup(args):
+    bad = reports.check_sales_daily()
+    for source, day, pid, orders, qty, revenue in bad[:20]:
+        print(f"only in {source}: {day} product {pid} orders={orders} qty={qty} revenue={revenue}")
+    print("sales_daily consistent" if not bad else f"{len(bad)} mismatching rows")
+    return 0 if not bad else 1
+
+def export_delta(args):
+    m = reports.export_delta(args.target, compress=args.compress)
+    print(f"products: {m['products']['rows']} changes "
+          f"(versions {m['products']['from_version']}..{m['products']['to_version']})")
+    print(f"sales: {m['sales']['rows']} new (ids {m['sales']['from_id']}..{m['sales']['to_id']})")
+    print(f"manifest: {m['path']}")
+    return 0
+
+def archive_sales(args):
+    result = archive.archive_sales(args.before, args.granularity)
+    print(f"moved {result['moved']} sales before {result['before']} into "
+          f"{', '.join(result['partitions']) or 'no partitions'}")
+    return 0
+
+def compact(args):
+    for name, saved in archive.compact().items():
+        print(f"{name}: {saved / 1e6:.1f} MB reclaimed")
+    return 0
+
+COMMANDS = {
+    "rebuild-rollup": rebuild_rollup,
+    "check-rollup": check_rollup,
+    "export-delta": export_delta,
+    "archive": archive_sales,
+    "compact": compact,
+}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("command", choices=sorted(COMMANDS))
+    ap.add_argument("--target", default="default", help="delta export consumer (export-delta)")
+    ap.add_argument("--compress", action="store_true", help="gzip delta files (export-delta)")
+    ap.add_argument("--before", help="archive sales before this YYYY-MM-DD (archive; "
+                                     f"default {archive.ARCHIVE_HORIZON_DAYS} days ago)")
+    ap.add_argument("--granularity", choices=["year", "month"], help="partition size (archive)")
+    args = ap.parse_args(argv)
+    init_db()
+    return COMMANDS[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
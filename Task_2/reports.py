@@ -1,60 +1,282 @@
-from db import get_conn
-from typing import List, Tuple
+import archive
+from db import get_conn, write_transaction
+from utils import date_range_clauses
+from typing import Callable, List, Optional, Tuple
 import csv
+import datetime
+import gzip
+import itertools
+import json
 from pathlib import Path
 
 EXPORT_DIR = Path(__file__).with_name("exports")
 EXPORT_DIR.mkdir(exist_ok=True)
 
-def low_stock(threshold: int = 5) -> List[Tuple]:
+LOW_STOCK_PAGE = 200
+
+def low_stock_page(threshold: int = 5, after: Tuple = None, limit: int = LOW_STOCK_PAGE) -> List[Tuple]:
+    """Products at or below `threshold` or their own reorder level, lowest first.
+
+    Each half of the condition is answered by its own index (idx_products_quantity
+    and the partial idx_products_below_reorder) and only `limit` rows are taken
+    from each. Pass the (quantity, id) of the last row as `after` for the next page.
+    """
+    if threshold is None:
+        threshold = -1  # only the reorder-level half applies
+    after = after if after is not None else (-1, 0)
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute("""SELECT id, name, sku, quantity, reorder_level
-                    FROM products
-                    WHERE quantity <= COALESCE(?, reorder_level) OR quantity <= reorder_level
-                    ORDER BY quantity ASC""", (threshold,))
+        cur.execute("""SELECT * FROM (
+                        SELECT id, name, sku, quantity, reorder_level FROM products
+                        WHERE quantity <= ? AND (quantity, id) > (?, ?)
+                        ORDER BY quantity, id LIMIT ?)
+                    UNION
+                    SELECT * FROM (
+                        SELECT id, name, sku, quantity, reorder_level FROM products
+                        WHERE quantity <= reorder_level AND (quantity, id) > (?, ?)
+                        ORDER BY quantity, id LIMIT ?)
+                    ORDER BY quantity, id LIMIT ?""",
+                    (threshold, *after, limit, *after, limit, limit))
         return cur.fetchall()
 
-def sales_summary(date_from: str = None, date_to: str = None):
-    # Returns (total_orders, total_qty, total_revenue)
-    query = "SELECT COUNT(*), COALESCE(SUM(quantity),0), COALESCE(SUM(total),0) FROM sales"
-    params = []
-    clauses = []
-    if date_from:
-        clauses.append("date(ts) >= date(?)")
-        params.append(date_from)
-    if date_to:
-        clauses.append("date(ts) <= date(?)")
-        params.append(date_to)
+def low_stock(threshold: int = 5) -> List[Tuple]:
+    rows, after = [], None
+    while True:
+        page = low_stock_page(threshold, after)
+        rows.extend(page)
+        if len(page) < LOW_STOCK_PAGE:
+            return rows
+        after = (page[-1][3], page[-1][0])
+
+def low_stock_count(threshold: int = 5) -> int:
+    """Number of rows low_stock(threshold) would return, from the indexes alone."""
+    if threshold is None:
+        threshold = -1
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""SELECT (SELECT COUNT(*) FROM products WHERE quantity <= ?)
+                            + (SELECT COUNT(*) FROM products
+                               WHERE quantity <= reorder_level AND quantity > ?)""",
+                    (threshold, threshold))
+        return cur.fetchone()[0]
+
+def _summary_query(date_from: str = None, date_to: str = None):
+    query = "SELECT COALESCE(SUM(orders),0), COALESCE(SUM(qty),0), COALESCE(SUM(revenue),0) FROM sales_daily"
+    clauses, params = date_range_clauses("day", date_from, date_to)
     if clauses:
         query += " WHERE " + " AND ".join(clauses)
+    return query, params
+
+def _summary_raw_query(date_from: str = None, date_to: str = None):
+    # per-table query of sales_summary_raw(), for archive.sales_union()
+    query = "SELECT COUNT(*) AS n, COALESCE(SUM(quantity),0) AS qty, COALESCE(SUM(total),0) AS revenue FROM {sales}"
+    clauses, params = date_range_clauses("ts", date_from, date_to)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    return query, params
+
+def sales_summary(date_from: str = None, date_to: str = None):
+    # Returns (total_orders, total_qty, total_revenue).
+    # Date filters are whole days, so the daily rollup answers exactly and the
+    # raw sales rows are never touched.
+    query, params = _summary_query(date_from, date_to)
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute(query, params)
         return cur.fetchone()
 
-def export_inventory_csv(filename: str = "inventory_export.csv") -> str:
-    path = EXPORT_DIR / filename
+def sales_summary_raw(date_from: str = None, date_to: str = None):
+    # Same as sales_summary(), computed from the raw sales rows (including
+    # the archive partitions that overlap the range)
+    query, params = _summary_raw_query(date_from, date_to)
+    orders, qty, revenue = 0, 0, 0
+    with get_conn() as conn:
+        for union, union_params in archive.sales_union(conn, query, params, date_from, date_to):
+            n, q, r = conn.execute(f"SELECT SUM(n), SUM(qty), SUM(revenue) FROM ({union})", union_params).fetchone()
+            orders, qty, revenue = orders + n, qty + q, revenue + r
+    return orders, qty, revenue
+
+_ROLLUP_SELECT = """SELECT substr(ts, 1, 10) AS day, product_id, COUNT(*) AS orders,
+                           SUM(quantity) AS qty, SUM(total) AS revenue
+                    FROM {sales} GROUP BY day, product_id"""
+
+def _raw_rollup(conn) -> str:
+    """SQL for the rollup recomputed from raw sales, archive partitions included.
+
+    Partitions don't change once written, so their share is computed into a
+    temp table first; ATTACH can't run inside the caller's transaction.
+    """
+    if not archive.partitions():
+        return _ROLLUP_SELECT.format(sales="main.sales")
+    conn.execute("""CREATE TEMP TABLE IF NOT EXISTS archived_rollup(
+                        day TEXT, product_id INTEGER, orders INTEGER, qty INTEGER, revenue REAL)""")
+    conn.execute("DELETE FROM temp.archived_rollup")
+    conn.commit()
+    for union, params in archive.sales_union(conn, "SELECT ts, product_id, quantity, total FROM {sales}",
+                                             include_main=False):
+        conn.execute("INSERT INTO temp.archived_rollup " + _ROLLUP_SELECT.format(sales=f"({union})"), params)
+        conn.commit()
+    return f"""SELECT day, product_id, SUM(orders) AS orders, SUM(qty) AS qty, SUM(revenue) AS revenue
+               FROM ({_ROLLUP_SELECT.format(sales="main.sales")}
+                     UNION ALL SELECT * FROM temp.archived_rollup)
+               GROUP BY day, product_id"""
+
+def rebuild_sales_daily() -> int:
+    """Recompute the sales_daily rollup from raw sales; returns rows written."""
+    with get_conn() as conn:
+        raw = _raw_rollup(conn)
+        with write_transaction():
+            conn.execute("DELETE FROM sales_daily")
+            cur = conn.execute("INSERT INTO sales_daily(day, product_id, orders, qty, revenue) " + raw)
+            return cur.rowcount
+
+def check_sales_daily(decimals: int = 4) -> List[Tuple]:
+    """Compare the rollup with raw sales.
+
+    Returns (source, day, product_id, orders, qty, revenue) for every row that
+    appears only in "rollup" or only in "raw" (revenue rounded to `decimals`);
+    an empty list means the rollup is consistent.
+    """
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT id, name, sku, price, quantity, reorder_level FROM products ORDER BY name;")
-        rows = cur.fetchall()
-    with open(path, "w", newline="", encoding="utf-8") as f:
+        cur.execute(f"""WITH raw AS (SELECT day, product_id, orders, qty, round(revenue, {int(decimals)})
+                                     FROM ({_raw_rollup(conn)})),
+                             roll AS (SELECT day, product_id, orders, qty, round(revenue, {int(decimals)})
+                                      FROM sales_daily)
+                        SELECT 'rollup', * FROM (SELECT * FROM roll EXCEPT SELECT * FROM raw)
+                        UNION ALL
+                        SELECT 'raw', * FROM (SELECT * FROM raw EXCEPT SELECT * FROM roll)
+                        ORDER BY 2, 3, 1""")
+        return cur.fetchall()
+
+EXPORT_BATCH = 5000
+
+def _open_export(path: Path, compress: bool):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8", buffering=1 << 20)
+
+def _stream_csv(path: Path, header, statements, compress: bool = False,
+                progress: Optional[Callable[[int], None]] = None,
+                batch_size: int = EXPORT_BATCH) -> int:
+    """Write the results of (query, params) `statements` to `path` in
+    fetchmany batches; returns the row count."""
+    written = 0
+    with get_conn() as conn, _open_export(path, compress) as f:
         writer = csv.writer(f)
-        writer.writerow(["ID", "Name", "SKU", "Price", "Quantity", "Reorder Level"])
-        writer.writerows(rows)
+        writer.writerow(header)
+        for query, params in statements:
+            cur = conn.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                written += len(rows)
+                if progress:
+                    progress(written)
+    return written
+
+def _export_path(filename: str, compress: bool) -> Path:
+    if compress and not filename.endswith(".gz"):
+        filename += ".gz"
+    return EXPORT_DIR / filename
+
+def export_inventory_csv(filename: str = "inventory_export.csv", compress: bool = False,
+                         progress: Optional[Callable[[int], None]] = None) -> str:
+    path = _export_path(filename, compress)
+    _stream_csv(path, ["ID", "Name", "SKU", "Price", "Quantity", "Reorder Level"],
+                [("SELECT id, name, sku, price, quantity, reorder_level FROM products ORDER BY name;", ())],
+                compress=compress, progress=progress)
     return str(path)
 
-def export_sales_csv(filename: str = "sales_export.csv") -> str:
-    path = EXPORT_DIR / filename
+def export_sales_csv(filename: str = "sales_export.csv", date_from: str = None, date_to: str = None,
+                     compress: bool = False, progress: Optional[Callable[[int], None]] = None) -> str:
+    path = _export_path(filename, compress)
+    query = "SELECT s.id, p.name, s.quantity, s.unit_price, s.total, s.ts FROM {sales} s JOIN products p ON s.product_id=p.id"
+    clauses, params = date_range_clauses("s.ts", date_from, date_to)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
     with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("""SELECT s.id, p.name, s.quantity, s.unit_price, s.total, s.ts
-                    FROM sales s JOIN products p ON s.product_id=p.id
-                    ORDER BY s.ts DESC;""")
-        rows = cur.fetchall()
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Sale ID", "Product", "Qty", "Unit Price", "Total", "Timestamp"])
-        writer.writerows(rows)
+        statements = ((f"SELECT * FROM ({union}) ORDER BY ts DESC", union_params)
+                      for union, union_params in archive.sales_union(conn, query, params, date_from, date_to))
+        _stream_csv(path, ["Sale ID", "Product", "Qty", "Unit Price", "Total", "Timestamp"],
+                    statements, compress=compress, progress=progress)
     return str(path)
+
+# --- Delta exports ----------------------------------------------------------
+# Each target (one per sync consumer) keeps two cursors in export_cursors: the
+# last exported products.row_version and the last exported sales.id. A delta
+# covers (cursor, high-water mark] for both, so its cost follows the number of
+# changes, not the size of the tables.
+
+def delta_cursors(target: str = "default") -> dict:
+    with get_conn() as conn:
+        rows = conn.execute("SELECT source, value FROM export_cursors WHERE target=?", (target,)).fetchall()
+    return {"products": 0, "sales": 0, **dict(rows)}
+
+def export_delta(target: str = "default", compress: bool = False,
+                 progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Write products and sales changed since the target's cursors.
+
+    Produces <prefix>_products.csv (upserts and deletes in row_version order),
+    <prefix>_sales.csv (new sales, archived ones included; in id order within
+    each source) and <prefix>.manifest.json, then
+    advances the cursors. If the run dies before that, the next run re-exports
+    the same range, so consumers should apply rows as upserts by id.
+    """
+    start = delta_cursors(target)
+    with get_conn() as conn:
+        # upper bounds fixed up front: changes committed while the files are
+        # being written get higher values and land in the next delta
+        hi_products = conn.execute("SELECT COALESCE(MAX(value), 0) FROM change_seq WHERE name='products'").fetchone()[0]
+        # sqlite_sequence rather than MAX(id): archiving may empty main.sales
+        hi_sales = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name='sales'").fetchone()[0]
+    lo_products = min(start["products"], hi_products)
+    lo_sales = min(start["sales"], hi_sales)
+    # named by range, so re-running an unacknowledged delta rewrites its files
+    prefix = f"delta_{target}_p{lo_products}-{hi_products}_s{lo_sales}-{hi_sales}"
+    products_path = _export_path(f"{prefix}_products.csv", compress)
+    sales_path = _export_path(f"{prefix}_sales.csv", compress)
+
+    n_products = _stream_csv(
+        products_path, ["Op", "ID", "Name", "SKU", "Price", "Quantity", "Reorder Level", "Version", "Changed At"],
+        [("""SELECT 'upsert', id, name, sku, price, quantity, reorder_level, row_version, updated_at
+               FROM products WHERE row_version > ? AND row_version <= ?
+           UNION ALL
+           SELECT 'delete', id, NULL, sku, NULL, NULL, NULL, row_version, deleted_at
+               FROM products_deleted WHERE row_version > ? AND row_version <= ?
+           ORDER BY 8""",
+          (lo_products, hi_products, lo_products, hi_products))], compress=compress, progress=progress)
+    # sales in the range may already have been archived, so the partitions
+    # are read too (oldest data first, then main; id order within each)
+    query = """SELECT s.id, s.product_id, p.sku, s.quantity, s.unit_price, s.total, s.ts
+               FROM {sales} s LEFT JOIN main.products p ON p.id = s.product_id
+               WHERE s.id > ? AND s.id <= ?"""
+    with get_conn() as conn:
+        statements = itertools.chain(
+            ((f"SELECT * FROM ({union}) ORDER BY 1", union_params) for union, union_params
+             in archive.sales_union(conn, query, (lo_sales, hi_sales), include_main=False)),
+            [(query.format(sales="main.sales") + " ORDER BY s.id", (lo_sales, hi_sales))])
+        n_sales = _stream_csv(
+            sales_path, ["Sale ID", "Product ID", "SKU", "Qty", "Unit Price", "Total", "Timestamp"],
+            statements, compress=compress, progress=progress)
+
+    manifest = {
+        "target": target,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "products": {"file": products_path.name, "rows": n_products,
+                     "from_version": lo_products, "to_version": hi_products},
+        "sales": {"file": sales_path.name, "rows": n_sales,
+                  "from_id": lo_sales, "to_id": hi_sales},
+    }
+    manifest_path = EXPORT_DIR / f"{prefix}.manifest.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    with write_transaction() as conn:
+        conn.executemany(
+            """INSERT INTO export_cursors(target, source, value, updated_at) VALUES(?,?,?,?)
+               ON CONFLICT(target, source) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at""",
+            [(target, "products", hi_products, manifest["created"]),
+             (target, "sales", hi_sales, manifest["created"])])
+    manifest["path"] = str(manifest_path)
+    return manifest
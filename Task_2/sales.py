@@ -1,5 +1,8 @@
-from db import get_conn
-from typing import List, Tuple
+import archive
+from db import get_conn, write_transaction
+from inventory import invalidate_products
+from utils import date_range_clauses
+from typing import Iterable, List, Tuple
 import datetime
 
 def record_sale(product_id: int, quantity: int, unit_price: float) -> int:
@@ -7,37 +10,100 @@ def record_sale(product_id: int, quantity: int, unit_price: float) -> int:
         raise ValueError("Quantity must be > 0")
     total = unit_price * quantity
     ts = datetime.datetime.now().isoformat(timespec="seconds")
-    with get_conn() as conn:
+    with write_transaction() as conn:
         cur = conn.cursor()
-        # ensure enough stock
-        cur.execute("SELECT quantity FROM products WHERE id=?", (product_id,))
-        row = cur.fetchone()
-        if not row:
-            raise ValueError("Product not found")
-        if row[0] < quantity:
-            raise ValueError("Insufficient stock")
+        # decrement stock only if enough is left; rowcount tells us whether it was
+        cur.execute("UPDATE products SET quantity = quantity - ? WHERE id=? AND quantity >= ?",
+                    (quantity, product_id, quantity))
+        if cur.rowcount == 0:
+            _raise_stock_error(cur, product_id)
         # insert sale
         cur.execute("""INSERT INTO sales(product_id, quantity, unit_price, total, ts)
                     VALUES(?,?,?,?,?)""", (product_id, quantity, unit_price, total, ts))
-        # decrement stock
-        cur.execute("UPDATE products SET quantity = quantity - ? WHERE id=?", (quantity, product_id))
-        conn.commit()
-        return cur.lastrowid
+    invalidate_products(product_id)
+    return cur.lastrowid
 
-def list_sales(date_from: str = None, date_to: str = None) -> List[Tuple]:
-    query = "SELECT s.id, p.name, s.quantity, s.unit_price, s.total, s.ts FROM sales s JOIN products p ON s.product_id=p.id"
-    params = []
-    clauses = []
-    if date_from:
-        clauses.append("date(s.ts) >= date(?)")
-        params.append(date_from)
-    if date_to:
-        clauses.append("date(s.ts) <= date(?)")
-        params.append(date_to)
+def _raise_stock_error(cur, product_id: int, suffix: str = ""):
+    cur.execute("SELECT 1 FROM products WHERE id=?", (product_id,))
+    if cur.fetchone() is None:
+        raise ValueError("Product not found" + suffix)
+    raise ValueError("Insufficient stock" + suffix)
+
+def record_sales_batch(items: Iterable[Tuple[int, int, float]]) -> List[int]:
+    """Record a whole basket of (product_id, quantity, unit_price) lines.
+
+    Each product is decremented with a conditional UPDATE and all inserts run
+    in the same transaction, so the basket is recorded completely or not at all.
+    Returns the new sale IDs in line order.
+    """
+    lines = [(int(pid), int(qty), float(price)) for pid, qty, price in items]
+    if not lines:
+        return []
+    if any(qty <= 0 for _, qty, _ in lines):
+        raise ValueError("Quantity must be > 0")
+    needed = {}
+    for pid, qty, _ in lines:
+        needed[pid] = needed.get(pid, 0) + qty
+    ts = datetime.datetime.now().isoformat(timespec="seconds")
+    with write_transaction() as conn:
+        cur = conn.cursor()
+        for pid, qty in needed.items():
+            cur.execute("UPDATE products SET quantity = quantity - ? WHERE id=? AND quantity >= ?",
+                        (qty, pid, qty))
+            if cur.rowcount == 0:
+                # raising rolls back the decrements already applied
+                _raise_stock_error(cur, pid, f" for product {pid}")
+        cur.executemany("""INSERT INTO sales(product_id, quantity, unit_price, total, ts)
+                        VALUES(?,?,?,?,?)""",
+                        [(pid, qty, price, price * qty, ts) for pid, qty, price in lines])
+        # AUTOINCREMENT ids are contiguous within a single write transaction
+        last = cur.execute("SELECT seq FROM sqlite_sequence WHERE name='sales'").fetchone()[0]
+    invalidate_products(*needed)
+    return list(range(last - len(lines) + 1, last + 1))
+
+_SALES_SELECT = """SELECT s.id, p.name, s.quantity, s.unit_price, s.total, s.ts
+                   FROM {sales} s JOIN products p ON s.product_id=p.id"""
+
+def _sales_query(date_from: str = None, date_to: str = None, after: Tuple = None,
+                 limit: int = None) -> Tuple[str, list]:
+    """The per-table query of list_sales()/list_sales_page(), for archive.sales_union()."""
+    query = _SALES_SELECT
+    clauses, params = date_range_clauses("s.ts", date_from, date_to)
+    if after is not None:
+        clauses.append("(s.ts, s.id) < (?, ?)")
+        params.extend(after)
     if clauses:
         query += " WHERE " + " AND ".join(clauses)
-    query += " ORDER BY s.ts DESC"
+    if limit is not None:
+        # each table stops after `limit` rows of its own index walk
+        query = f"SELECT * FROM ({query} ORDER BY s.ts DESC, s.id DESC LIMIT ?)"
+        params.append(limit)
+    return query, params
+
+def list_sales(date_from: str = None, date_to: str = None) -> List[Tuple]:
+    query, params = _sales_query(date_from, date_to)
+    rows = []
     with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(query, params)
-        return cur.fetchall()
+        # archive partitions are time-disjoint and come newest first
+        for union, union_params in archive.sales_union(conn, query, params, date_from, date_to):
+            rows += conn.execute(f"SELECT * FROM ({union}) ORDER BY ts DESC", union_params).fetchall()
+    return rows
+
+PAGE_SIZE = 200
+
+def list_sales_page(date_from: str = None, date_to: str = None, after: Tuple = None,
+                    limit: int = PAGE_SIZE) -> List[Tuple]:
+    """One page of list_sales(), newest first.
+
+    Pass the (ts, id) of the last row of the previous page as `after` to get
+    the next page; the keyset seek costs the same on page 1 and page 1000.
+    """
+    query, params = _sales_query(date_from, date_to, after, limit)
+    rows = []
+    with get_conn() as conn:
+        for union, union_params in archive.sales_union(conn, query, params, date_from, date_to):
+            rows += conn.execute(f"SELECT * FROM ({union}) ORDER BY ts DESC, id DESC LIMIT ?",
+                                 (*union_params, limit - len(rows))).fetchall()
+            if len(rows) >= limit:
+                break
+    return rows
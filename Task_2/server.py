@@ -0,0 +1,405 @@
+"""Headless HTTP/JSON service for products, sales, reports and users.
+
+    python server.py [--host 127.0.0.1] [--port 8080] [--workers 8]
+
+Standard library only: asyncio streams with HTTP/1.1 keep-alive. SQLite calls
+run on a bounded thread pool so the event loop never blocks. POST /api/login
+returns a session token; every other request needs "Authorization: Bearer
+<token>" (checked in memory) or HTTP Basic credentials.
+
+Listings are paginated: responses carry "next", which is passed back as the
+`after` query parameter (JSON) to get the following page. GET /api/sales/export
+streams every matching sale as a chunked JSON array.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qsl, urlsplit
+
+import auth
+import inventory
+import reports
+import sales
+from db import init_db, seed_admin_if_missing
+
+MAX_BODY = 1 << 20
+KEEPALIVE_TIMEOUT = 30
+PAGE_LIMIT = 1000
+
+PRODUCT_FIELDS = ("id", "name", "sku", "price", "quantity", "reorder_level")
+SALE_FIELDS = ("id", "product", "quantity", "unit_price", "total", "ts")
+LOW_STOCK_FIELDS = ("id", "name", "sku", "quantity", "reorder_level")
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class Request:
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.user = None
+
+    def json(self) -> dict:
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return data
+
+    def arg(self, name, default=None, cast=str):
+        value = self.query.get(name)
+        if value in (None, ""):
+            return default
+        try:
+            return cast(value)
+        except ValueError:
+            raise HTTPError(400, f"Invalid value for {name}")
+
+    def limit_arg(self, default: int) -> int:
+        return max(1, min(self.arg("limit", default, int), PAGE_LIMIT))
+
+    def page_args(self, default_limit: int):
+        after = self.arg("after", cast=json.loads)
+        if after is not None and not (
+                isinstance(after, list) and len(after) == 2  # every cursor is (sort key, id)
+                and all(v is None or isinstance(v, (str, int, float)) for v in after)):
+            raise HTTPError(400, "Invalid value for after")
+        return (tuple(after) if after is not None else None), self.limit_arg(default_limit)
+
+def rows_to_dicts(fields, rows):
+    return [dict(zip(fields, r)) for r in rows]
+
+def page(fields, rows, limit, cursor_of):
+    return {"items": rows_to_dicts(fields, rows),
+            "next": list(cursor_of(rows[-1])) if len(rows) == limit else None}
+
+class InventoryService:
+    def __init__(self, workers: int = 8):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-worker")
+        # bounds queued work as well as running work; callers wait beyond it
+        self.slots = asyncio.Semaphore(workers * 4)
+        self.routes = [
+            ("POST", ("api", "login"), self.login),
+            ("POST", ("api", "logout"), self.logout),
+            ("GET", ("api", "products"), self.list_products),
+            ("POST", ("api", "products"), self.add_product),
+            ("GET", ("api", "products", "search"), self.search_products),
+            ("GET", ("api", "products", None), self.get_product),
+            ("PUT", ("api", "products", None), self.update_product),
+            ("DELETE", ("api", "products", None), self.delete_product),
+            ("POST", ("api", "products", None, "adjust"), self.adjust_stock),
+            ("GET", ("api", "sales"), self.list_sales),
+            ("POST", ("api", "sales"), self.record_sale),
+            ("GET", ("api", "sales", "export"), self.export_sales),
+            ("GET", ("api", "reports", "summary"), self.sales_summary),
+            ("GET", ("api", "reports", "low-stock"), self.low_stock),
+            ("GET", ("api", "reports", "low-stock", "count"), self.low_stock_count),
+            ("GET", ("api", "users"), self.list_users),
+        ]
+        # handlers reachable without credentials; bound methods compare
+        # equal (not identical) on every attribute access
+        self.public = {self.login}
+
+    async def call(self, fn, *args, **kwargs):
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    def match(self, method, path):
+        parts = tuple(p for p in path.split("/") if p)
+        allowed = False
+        for m, pattern, handler in self.routes:
+            if len(pattern) != len(parts):
+                continue
+            params = []
+            for want, got in zip(pattern, parts):
+                if want is None:
+                    params.append(got)
+                elif want != got:
+                    break
+            else:
+                if m == method:
+                    return handler, params
+                allowed = True
+        raise HTTPError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+    async def authenticate(self, req: Request):
+        header = req.headers.get("authorization", "")
+        if header.lower().startswith("bearer "):
+            session = auth.validate_session(header[7:].strip())
+            if session is None:
+                raise HTTPError(401, "Session expired or revoked")
+            req.user = session["username"]
+            return
+        if header.lower().startswith("basic "):
+            try:
+                username, _, password = base64.b64decode(header[6:]).decode("utf-8").partition(":")
+            except ValueError:
+                raise HTTPError(401, "Malformed credentials")
+            if await self.call(auth.validate_login, username, password):
+                req.user = username
+                return
+        raise HTTPError(401, "Authentication required")
+
+    async def dispatch(self, req: Request, writer):
+        handler, params = self.match(req.method, req.path)
+        if handler not in self.public:
+            await self.authenticate(req)
+        return await handler(req, writer, *params)
+
+    # --- auth ---------------------------------------------------------------
+
+    async def login(self, req, writer):
+        data = req.json()
+        token = await self.call(auth.login, str(data.get("username", "")), str(data.get("password", "")))
+        if token is None:
+            raise HTTPError(401, "Invalid username or password")
+        return 200, {"token": token, "expires_in": auth.sessions.ttl}
+
+    async def logout(self, req, writer):
+        header = req.headers.get("authorization", "")
+        if header.lower().startswith("bearer "):
+            auth.logout(header[7:].strip())
+        return 200, {"ok": True}
+
+    async def list_users(self, req, writer):
+        users = await self.call(auth.list_users)
+        return 200, {"items": rows_to_dicts(("id", "username", "role"), users)}
+
+    # --- products -----------------------------------------------------------
+
+    async def list_products(self, req, writer):
+        after, limit = req.page_args(inventory.PAGE_SIZE)
+        rows = await self.call(inventory.list_products_page, req.arg("search", ""), after, limit)
+        return 200, page(PRODUCT_FIELDS, rows, limit, lambda r: (r[1], r[0]))
+
+    async def search_products(self, req, writer):
+        limit = req.limit_arg(inventory.SEARCH_LIMIT)
+        rows = await self.call(inventory.search_products, req.arg("q", ""), limit)
+        return 200, {"items": rows_to_dicts(PRODUCT_FIELDS, rows)}
+
+    async def get_product(self, req, writer, product_id):
+        row = await self.call(inventory.get_product, _int(product_id))
+        if row is None:
+            raise HTTPError(404, "Product not found")
+        return 200, dict(zip(PRODUCT_FIELDS, row))
+
+    def _product_args(self, data):
+        try:
+            return (str(data["name"]).strip(), str(data["sku"]).strip(), _price(data["price"]),
+                    int(data["quantity"]), int(data.get("reorder_level", 5)))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "name, sku, price and quantity are required")
+
+    async def add_product(self, req, writer):
+        args = self._product_args(req.json())
+        return 201, {"id": await self.call(inventory.add_product, *args)}
+
+    async def update_product(self, req, writer, product_id):
+        args = self._product_args(req.json())
+        if not await self.call(inventory.update_product, _int(product_id), *args):
+            raise HTTPError(404, "Product not found")
+        return 200, {"ok": True}
+
+    async def delete_product(self, req, writer, product_id):
+        if not await self.call(inventory.delete_product, _int(product_id)):
+            raise HTTPError(404, "Product not found")
+        return 200, {"ok": True}
+
+    async def adjust_stock(self, req, writer, product_id):
+        try:
+            delta = int(req.json()["delta"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "delta is required")
+        await self.call(inventory.adjust_stock, _int(product_id), delta)
+        return 200, {"ok": True}
+
+    # --- sales --------------------------------------------------------------
+
+    async def list_sales(self, req, writer):
+        after, limit = req.page_args(sales.PAGE_SIZE)
+        rows = await self.call(sales.list_sales_page, req.arg("from"), req.arg("to"), after, limit)
+        return 200, page(SALE_FIELDS, rows, limit, lambda r: (r[5], r[0]))
+
+    async def record_sale(self, req, writer):
+        data = req.json()
+        lines = data["items"] if "items" in data else [data]
+        try:
+            items = [(int(i["product_id"]), int(i["quantity"]), _price(i["unit_price"])) for i in lines]
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "product_id, quantity and unit_price are required")
+        if "items" in data:
+            return 201, {"ids": await self.call(sales.record_sales_batch, items)}
+        return 201, {"id": await self.call(sales.record_sale, *items[0])}
+
+    async def export_sales(self, req, writer):
+        date_from, date_to = req.arg("from"), req.arg("to")
+        await self.call(sales.list_sales_page, date_from, date_to, None, 1)  # validate dates before 200
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+        first, after = True, None
+        try:
+            while True:
+                rows = await self.call(sales.list_sales_page, date_from, date_to, after, sales.PAGE_SIZE)
+                if rows:
+                    body = ",".join(json.dumps(d) for d in rows_to_dicts(SALE_FIELDS, rows))
+                    _write_chunk(writer, ("[" if first else ",") + body)
+                    first = False
+                    await writer.drain()
+                if len(rows) < sales.PAGE_SIZE:
+                    break
+                after = (rows[-1][5], rows[-1][0])
+        except Exception:
+            # headers are already out; the only way to signal failure is to drop the connection
+            raise ConnectionError("export aborted")
+        _write_chunk(writer, "[]" if first else "]")
+        writer.write(b"0\r\n\r\n")
+        return None
+
+    # --- reports ------------------------------------------------------------
+
+    async def sales_summary(self, req, writer):
+        orders, qty, revenue = await self.call(reports.sales_summary, req.arg("from"), req.arg("to"))
+        return 200, {"orders": orders, "quantity": qty, "revenue": revenue}
+
+    async def low_stock(self, req, writer):
+        after, limit = req.page_args(reports.LOW_STOCK_PAGE)
+        rows = await self.call(reports.low_stock_page, req.arg("threshold", 5, int), after, limit)
+        return 200, page(LOW_STOCK_FIELDS, rows, limit, lambda r: (r[3], r[0]))
+
+    async def low_stock_count(self, req, writer):
+        return 200, {"count": await self.call(reports.low_stock_count, req.arg("threshold", 5, int))}
+
+    # --- HTTP plumbing ------------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    req = await asyncio.wait_for(_read_request(reader), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as e:
+                    _write_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if req is None:
+                    break
+                keep_alive = req.headers.get("connection", "").lower() != "close"
+                try:
+                    result = await self.dispatch(req, writer)
+                except HTTPError as e:
+                    result = e.status, {"error": str(e)}
+                except ConnectionError:
+                    raise
+                except ValueError as e:
+                    result = 400, {"error": str(e)}
+                except sqlite3.IntegrityError as e:
+                    result = 409, {"error": str(e)}
+                except Exception as e:
+                    result = 500, {"error": f"{type(e).__name__}: {e}"}
+                if result is not None:
+                    _write_json(writer, *result, keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def _readline(reader) -> bytes:
+    try:
+        return await reader.readline()
+    except ValueError:  # a line longer than the stream limit
+        raise HTTPError(400, "Request line or header too long")
+
+async def _read_request(reader):
+    line = await _readline(reader)
+    if not line:
+        return None
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await _readline(reader)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers, body)
+
+def _write_json(writer, status: int, payload, keep_alive: bool = True):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+
+def _write_chunk(writer, text: str):
+    data = text.encode("utf-8")
+    writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+def _price(value) -> float:
+    # float() accepts "nan" and "inf"; neither is a price
+    price = float(value)
+    if not math.isfinite(price) or price < 0:
+        raise HTTPError(400, "Prices must be finite numbers >= 0")
+    return price
+
+def _int(value) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(404, "Not found")
+
+async def serve(host: str, port: int, workers: int):
+    service = InventoryService(workers)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Serving on http://{host}:{port} with {workers} database workers", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args(argv)
+    init_db()
+    auth.calibrate_hashing()
+    seed_admin_if_missing()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
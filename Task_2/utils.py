@@ -1,6 +1,9 @@
+import datetime
+import math
+
 def is_positive_float(value: str) -> bool:
     try:
-        return float(value) >= 0
+        return math.isfinite(float(value)) and float(value) >= 0
     except Exception:
         return False
 
@@ -15,3 +18,32 @@ def is_positive_int(value: str) -> bool:
         return int(value) > 0
     except Exception:
         return False
+
+def day_bounds(date_from: str = None, date_to: str = None):
+    """Half-open [start, end) ISO day strings for an inclusive date range.
+
+    Only the leading YYYY-MM-DD of each value counts; a missing bound is None.
+    """
+    start = end = None
+    if date_from:
+        start = datetime.date.fromisoformat(date_from.strip()[:10]).isoformat()
+    if date_to:
+        end = (datetime.date.fromisoformat(date_to.strip()[:10]) + datetime.timedelta(days=1)).isoformat()
+    return start, end
+
+def date_range_clauses(column: str, date_from: str = None, date_to: str = None):
+    """Build half-open `column >= from AND column < to+1day` predicates.
+
+    Timestamps are stored as ISO text, so plain string comparison against day
+    boundaries lets SQLite use an index on `column` instead of calling date()
+    on every row. Returns (clauses, params).
+    """
+    clauses, params = [], []
+    start, end = day_bounds(date_from, date_to)
+    if start:
+        clauses.append(f"{column} >= ?")
+        params.append(start)
+    if end:
+        clauses.append(f"{column} < ?")
+        params.append(end)
+    return clauses, params
@@ -0,0 +1,215 @@
+"""Columnar account store for very large ATM account populations.
+
+Accounts are numbered 0..n-1. The balance of account n is slot n of one
+array('q'), and its PIN is an 8-byte keyed BLAKE2b digest at offset 8*n of
+one bytearray. That is 16 bytes per account, against roughly 90 (with
+__slots__) to 140 bytes for one Python object per account. Storing digests
+also means the store never holds a plain PIN. AccountStore offers the
+Ledger methods task_1.ATM calls, so ATM(ledger=store, account=n) works
+unchanged.
+
+The gain is memory, not speed. The bulk operations (interest, postings,
+statement totals) still visit accounts one at a time in Python. Interest is
+applied a slice at a time only to bound how long sessions wait on the
+locks. It is no faster than a loop over account objects, and
+bench/account_memory.py shows it somewhat slower.
+
+Nothing here is journaled or persisted; DurableLedger remains the store for
+durable accounts.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+from array import array
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Tuple
+
+from atm_ledger import LOCK_STRIPES
+
+PIN_BYTES = 8
+BULK_SLICE = 1 << 20  # accounts per slice in bulk operations
+INT64_MAX = 2 ** 63 - 1
+
+class AccountStore:
+    def __init__(self, stripes: int = LOCK_STRIPES, key: bytes = None):
+        self._balances = array("q")
+        self._pins = bytearray()
+        # digests are keyed per store and salted with the account number, so
+        # equal PINs on different accounts don't produce equal digests
+        self._key = key or secrets.token_bytes(32)
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._grow = threading.Lock()
+
+    def _digest(self, account: int, pin: str) -> bytes:
+        return hashlib.blake2b(str(pin).encode(), digest_size=PIN_BYTES, key=self._key,
+                               salt=account.to_bytes(16, "little")).digest()
+
+    def _stripe(self, account: int) -> int:
+        return account % len(self._locks)
+
+    def _check(self, account) -> int:
+        # array indexing would silently accept negative account numbers
+        if account not in self:
+            raise KeyError(account)
+        return account
+
+    def open_accounts(self, count: int, balance: int = 0, pins: Iterable[str] = None,
+                      balances: Iterable[int] = None) -> range:
+        """Append `count` accounts; returns their numbers.
+
+        Every account opens with `balance`, or with its own entry of
+        `balances` if given. `pins` gives one PIN per new account. Without it
+        the accounts have no PIN and verify_pin() is False until set_pin().
+        """
+        opening = array("q", [balance]) * count if balances is None else array("q", balances)
+        if len(opening) != count:
+            raise ValueError(f"Expected {count} balances, got {len(opening)}")
+        if min(opening, default=0) < 0:
+            raise ValueError("Opening balance must be >= 0")
+        with self._grow:
+            first = len(self._balances)
+            if pins is None:
+                digests = bytes(PIN_BYTES * count)
+            else:
+                digests = b"".join(self._digest(first + i, pin) for i, pin in enumerate(pins))
+                if len(digests) != PIN_BYTES * count:
+                    raise ValueError(f"Expected {count} PINs, got {len(digests) // PIN_BYTES}")
+            self._pins.extend(digests)
+            self._balances.extend(opening)
+        return range(first, first + count)
+
+    def open_account(self, balance: int = 0, pin: str = None) -> int:
+        """Open one account; returns its number."""
+        return self.open_accounts(1, balance, None if pin is None else [pin])[0]
+
+    def __contains__(self, account) -> bool:
+        return isinstance(account, int) and 0 <= account < len(self._balances)
+
+    def __len__(self) -> int:
+        return len(self._balances)
+
+    def balance(self, account: int) -> int:
+        return self._balances[self._check(account)]
+
+    def verify_pin(self, account: int, pin: str) -> bool:
+        at = self._check(account) * PIN_BYTES
+        return hmac.compare_digest(self._pins[at:at + PIN_BYTES], self._digest(account, pin))
+
+    def set_pin(self, account: int, pin: str) -> None:
+        at = self._check(account) * PIN_BYTES
+        with self._locks[self._stripe(account)]:
+            self._pins[at:at + PIN_BYTES] = self._digest(account, pin)
+
+    def change_pin(self, account: int, old_pin: str, new_pin: str) -> bool:
+        at = self._check(account) * PIN_BYTES
+        with self._locks[self._stripe(account)]:
+            if not self.verify_pin(account, old_pin):
+                return False
+            self._pins[at:at + PIN_BYTES] = self._digest(account, new_pin)
+        return True
+
+    def deposit(self, account: int, amount: int) -> bool:
+        if amount <= 0:
+            return False
+        with self._locks[self._stripe(self._check(account))]:
+            self._balances[account] += amount
+        return True
+
+    def withdraw(self, account: int, amount: int) -> bool:
+        if amount <= 0:
+            return False
+        with self._locks[self._stripe(self._check(account))]:
+            if amount > self._balances[account]:
+                return False
+            self._balances[account] -= amount
+        return True
+
+    def transfer(self, src: int, dst: int, amount: int) -> bool:
+        """Move `amount` from src to dst atomically; False if src can't cover it."""
+        if amount <= 0 or src == dst:
+            return False
+        first, second = sorted((self._stripe(self._check(src)), self._stripe(self._check(dst))))
+        with self._locks[first]:
+            with self._locks[second] if second != first else nullcontext():
+                if amount > self._balances[src]:
+                    return False
+                self._balances[src] -= amount
+                self._balances[dst] += amount
+        return True
+
+    @contextmanager
+    def _all_stripes(self):
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def total(self) -> int:
+        """Sum of all balances, taken with every stripe held (a consistent cut)."""
+        with self._all_stripes():
+            return sum(self._balances)
+
+    def post_interest(self, rate_bp: int) -> int:
+        """Credit floor(balance * rate_bp / 10000) to every account; returns
+        the total paid. Integer basis points keep the arithmetic exact.
+
+        Each slice of BULK_SLICE accounts is rewritten in one assignment with
+        every stripe held, so sessions wait for at most one slice, not the run.
+        Raises OverflowError, changing nothing, if the largest balance would
+        leave int64. A deposit landing between that check and a later slice
+        can still overflow it; that slice and the ones after it are then
+        left uncredited, and the OverflowError propagates.
+        """
+        with self._all_stripes():
+            top = max(self._balances, default=0)
+            if top + top * rate_bp // 10000 > INT64_MAX:
+                raise OverflowError(f"Interest at {rate_bp} bp would overflow a balance of {top}")
+        paid = 0
+        for start in range(0, len(self._balances), BULK_SLICE):
+            with self._all_stripes():
+                old = self._balances[start:start + BULK_SLICE]
+                new = array("q", [b + b * rate_bp // 10000 for b in old])
+                self._balances[start:start + len(new)] = new
+            paid += sum(new) - sum(old)
+        return paid
+
+    def apply_postings(self, accounts: Iterable[int], amounts: Iterable[int]) -> int:
+        """Apply a batch of signed postings all-or-nothing; returns the number
+        of accounts touched. Raises ValueError, changing nothing, if any account
+        would end up negative."""
+        net = _net(accounts, amounts)
+        for account in net:
+            self._check(account)
+        with self._all_stripes():
+            short = [a for a, delta in net.items() if self._balances[a] + delta < 0]
+            if short:
+                raise ValueError(f"{len(short)} accounts would be overdrawn, first {short[0]}")
+            for a, delta in net.items():
+                self._balances[a] += delta
+        return len(net)
+
+    def statement_totals(self, accounts: Iterable[int],
+                         amounts: Iterable[int]) -> Dict[int, Tuple[int, int, int]]:
+        """{account: (credits, debits, closing balance)} for a batch of signed
+        postings already applied to the store."""
+        credits, debits = {}, {}
+        for a, amount in zip(accounts, amounts):
+            if amount >= 0:
+                credits[a] = credits.get(a, 0) + amount
+            else:
+                debits[a] = debits.get(a, 0) - amount
+        return {a: (credits.get(a, 0), debits.get(a, 0), self.balance(a))
+                for a in credits.keys() | debits.keys()}
+
+def _net(accounts: Iterable[int], amounts: Iterable[int]) -> Dict[int, int]:
+    accounts, amounts = list(accounts), list(amounts)
+    if len(accounts) != len(amounts):
+        raise ValueError(f"{len(accounts)} accounts but {len(amounts)} amounts")
+    net = {}
+    for a, amount in zip(accounts, amounts):
+        net[a] = net.get(a, 0) + amount
+    return net
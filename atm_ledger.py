@@ -0,0 +1,173 @@
+"""Thread-safe multi-account ledger behind task_1.ATM.
+
+Balances and PINs live in dicts keyed by account number. Instead of one lock
+per account, accounts hash onto a fixed set of striped locks, so millions of
+accounts cost a few thousand locks. With keep_journal=True every successful
+change is also appended to an in-memory journal. That is off by default
+because it grows without bound; a long-running ATM would leak memory.
+Transfers take both stripes in index order, so two opposite transfers can
+never deadlock.
+"""
+import itertools
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, List, Optional
+
+LOCK_STRIPES = 4096
+
+# kind is "open", "deposit", "withdraw", "transfer_out", "transfer_in" or "pin";
+# balance is the account balance right after the entry; counterparty is the
+# other account of a transfer, or the PIN (as stored, see _seal_pin) set by
+# "open" and "pin" entries
+JournalEntry = namedtuple("JournalEntry", "seq ts kind account amount balance counterparty")
+
+class Ledger:
+    def __init__(self, stripes: int = LOCK_STRIPES, keep_journal: bool = False):
+        self._balances = {}
+        self._pins = {}
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self.keep_journal = keep_journal
+        self._journal = []
+        # next() on a count and list.append are atomic in CPython, so
+        # journaling needs no lock of its own
+        self._seq = itertools.count(1)
+
+    def _stripe(self, account) -> int:
+        return hash(account) % len(self._locks)
+
+    def _log(self, kind: str, account, amount: int, balance: int, counterparty=None) -> JournalEntry:
+        entry = JournalEntry(next(self._seq), time.time(), kind, account, amount, balance, counterparty)
+        if self.keep_journal:
+            self._journal.append(entry)
+        return entry
+
+    def _seal_pin(self, pin):
+        """The form a PIN is stored and journaled in; plain for the in-memory
+        ledger, a salted digest for persistent ones."""
+        return pin
+
+    def _pin_matches(self, stored, pin) -> bool:
+        return stored == pin
+
+    def _durable(self):
+        """Called after the locks are released; persistent ledgers wait here
+        until this thread's journal entries are on disk."""
+
+    def _open(self, account, balance: int, pin: str):
+        if balance < 0:
+            raise ValueError("Opening balance must be >= 0")
+        with self._locks[self._stripe(account)]:
+            if account in self._balances:
+                raise ValueError(f"Account {account} already exists")
+            self._balances[account] = balance
+            self._pins[account] = self._seal_pin(pin)
+            self._log("open", account, balance, balance, self._pins[account])
+
+    def open_account(self, account, balance: int = 0, pin: str = None) -> None:
+        self._open(account, balance, pin)
+        self._durable()
+
+    def open_accounts(self, accounts) -> int:
+        """Open many (account, balance, pin) at once with a single durability wait."""
+        n = 0
+        for account, balance, pin in accounts:
+            self._open(account, balance, pin)
+            n += 1
+        self._durable()
+        return n
+
+    def __contains__(self, account) -> bool:
+        return account in self._balances
+
+    def __len__(self) -> int:
+        return len(self._balances)
+
+    def balance(self, account) -> int:
+        return self._balances[account]
+
+    def verify_pin(self, account, pin: str) -> bool:
+        return self._pin_matches(self._pins[account], pin)
+
+    def change_pin(self, account, old_pin: str, new_pin: str) -> bool:
+        with self._locks[self._stripe(account)]:
+            if not self._pin_matches(self._pins[account], old_pin):
+                return False
+            self._pins[account] = self._seal_pin(new_pin)
+            self._log("pin", account, 0, self._balances[account], self._pins[account])
+        self._durable()
+        return True
+
+    def deposit(self, account, amount: int) -> bool:
+        if amount <= 0:
+            return False
+        with self._locks[self._stripe(account)]:
+            balance = self._balances[account] + amount
+            self._balances[account] = balance
+            self._log("deposit", account, amount, balance)
+        self._durable()
+        return True
+
+    def withdraw(self, account, amount: int) -> bool:
+        if amount <= 0:
+            return False
+        with self._locks[self._stripe(account)]:
+            balance = self._balances[account]
+            if amount > balance:
+                return False
+            self._balances[account] = balance - amount
+            self._log("withdraw", account, amount, balance - amount)
+        self._durable()
+        return True
+
+    def transfer(self, src, dst, amount: int) -> bool:
+        """Move `amount` from src to dst atomically; False if src can't cover it."""
+        if amount <= 0 or src == dst:
+            return False
+        if src not in self._balances or dst not in self._balances:
+            raise KeyError(src if src not in self._balances else dst)
+        first, second = sorted((self._stripe(src), self._stripe(dst)))
+        with self._locks[first]:
+            # both accounts may share a stripe; Lock is not reentrant
+            with self._locks[second] if second != first else nullcontext():
+                balance = self._balances[src]
+                if amount > balance:
+                    return False
+                self._balances[src] = balance - amount
+                self._balances[dst] += amount
+                self._log("transfer_out", src, amount, balance - amount, dst)
+                self._log("transfer_in", dst, amount, self._balances[dst], src)
+        self._durable()
+        return True
+
+    @contextmanager
+    def _all_stripes(self):
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def total(self) -> int:
+        """Sum of all balances, taken with every stripe held (a consistent cut)."""
+        with self._all_stripes():
+            return sum(self._balances.values())
+
+    def journal(self, since: int = 0) -> List[JournalEntry]:
+        """Entries with seq > since, in sequence order."""
+        if not self.keep_journal:
+            raise RuntimeError("This ledger keeps no journal (Ledger(keep_journal=True))")
+        return sorted((e for e in self._journal[:] if e.seq > since), key=lambda e: e.seq)
+
+    def replay(self, entries: Optional[Iterator[JournalEntry]] = None) -> dict:
+        """Balances rebuilt from the journal alone; should equal the live ones."""
+        balances = {}
+        for e in entries if entries is not None else self.journal():
+            if e.kind in ("open", "deposit", "transfer_in"):
+                balances[e.account] = balances.get(e.account, 0) + e.amount
+            elif e.kind in ("withdraw", "transfer_out"):
+                balances[e.account] -= e.amount
+        return balances
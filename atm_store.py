@@ -0,0 +1,282 @@
+"""Durable storage for the ATM ledger: a write-ahead log plus snapshots.
+
+Every journal entry is appended to <dir>/journal.log as one JSON line; the
+two legs of a transfer share one line, so they replay together or not at
+all. A background flusher gathers the entries that arrive within
+`window_ms` (or until `max_batch` are waiting) and writes them with a
+single fsync, the "group commit". Callers return only once their entry is on disk, so a
+transaction costs at most one window plus one fsync, however many sessions
+are active. With window_ms=0 every transaction does its own write and fsync.
+
+PINs are kept, journaled and snapshotted only as salted BLAKE2b digests
+("b2$<salt>$<digest>"). A 4-digit PIN can still be brute-forced from its
+digest, so the files stay private, but no PIN is written out in plain text.
+
+A snapshot (<dir>/snapshot.json) holds every account as of a journal
+sequence number. The log is emptied after each snapshot. Recovery loads the
+snapshot, then replays the log entries written after it, and drops a torn
+last line left by a crash mid-write.
+"""
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from atm_ledger import LOCK_STRIPES, JournalEntry, Ledger
+
+GROUP_COMMIT_MS = 1.0
+MAX_BATCH = 4096
+SNAPSHOT_EVERY = 1000000  # log entries between automatic snapshots
+
+class WriteAheadLog:
+    def __init__(self, path, window_ms: float = GROUP_COMMIT_MS, max_batch: int = MAX_BATCH,
+                 fsync: bool = True):
+        self.path = Path(path)
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.records = 0  # appended since the last truncate()
+        self._f = open(self.path, "ab")
+        self._cond = threading.Condition()
+        self._pending = []
+        self._submitted = 0
+        self._written = 0
+        self._error = None
+        self._closed = False
+        self._flusher = None
+        if self.window > 0:
+            self._flusher = threading.Thread(target=self._run, name="wal-flusher", daemon=True)
+            self._flusher.start()
+
+    def append(self, record: bytes) -> int:
+        """Queue one record; returns the ticket to pass to wait()."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Log is closed")
+            self._pending.append(record)
+            self._submitted += 1
+            self.records += 1
+            if self._flusher is None:
+                self._write(self._pending)
+                self._pending = []
+                self._written = self._submitted
+            elif len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+            return self._submitted
+
+    def wait(self, ticket: int = None) -> None:
+        """Block until record `ticket` (default: everything queued) is durable."""
+        with self._cond:
+            ticket = self._submitted if ticket is None else ticket
+            while self._written < ticket:
+                if self._error is not None:
+                    raise self._error
+                self._cond.wait()
+
+    def _write(self, batch):
+        self._f.write(b"".join(batch))
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # let more sessions join the batch, but never past one window
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                upto = self._submitted
+            try:
+                self._write(batch)
+            except OSError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._written = upto
+                self._cond.notify_all()
+
+    def truncate(self) -> None:
+        """Empty the log; only safe once everything in it is covered by a snapshot."""
+        self.wait()
+        with self._cond:
+            self._f.truncate(0)
+            if self.fsync:
+                os.fsync(self._f.fileno())
+            self.records = 0
+
+    def close(self) -> None:
+        self.wait()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._f.close()
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _encode(record) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+PIN_SCHEME = "b2"
+
+def _pin_digest(pin: str, salt: bytes) -> str:
+    return hashlib.blake2b(str(pin).encode(), digest_size=16, salt=salt).hexdigest()
+
+def seal_pin(pin):
+    if pin is None:
+        return None
+    salt = os.urandom(16)
+    return f"{PIN_SCHEME}${salt.hex()}${_pin_digest(pin, salt)}"
+
+def _restore_pin(stored):
+    # files written before PINs were digested hold them in plain text; they
+    # are sealed on load and leave the files at the next snapshot
+    if stored is None or str(stored).startswith(PIN_SCHEME + "$"):
+        return stored
+    return seal_pin(stored)
+
+def pin_matches(stored, pin) -> bool:
+    if stored is None or pin is None:
+        return False
+    _scheme, salt, digest = stored.split("$")
+    return hmac.compare_digest(digest, _pin_digest(pin, bytes.fromhex(salt)))
+
+def _decode(line: bytes) -> list:
+    """Journal entries in one log line: a single entry, or a list of entries
+    written together (both legs of a transfer)."""
+    record = json.loads(line)
+    if record and isinstance(record[0], list):
+        return [JournalEntry(*e) for e in record]
+    return [JournalEntry(*record)]
+
+class DurableLedger(Ledger):
+    """A Ledger whose changes survive restarts; recovers from `directory`."""
+
+    def __init__(self, directory, window_ms: float = GROUP_COMMIT_MS, stripes: int = LOCK_STRIPES,
+                 fsync: bool = True, snapshot_every: int = SNAPSHOT_EVERY):
+        super().__init__(stripes)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self._local = threading.local()
+        self._snapshot_lock = threading.Lock()
+        self._recover()
+        self.log = WriteAheadLog(self.directory / "journal.log", window_ms, fsync=fsync)
+
+    def _recover(self):
+        last = snap_seq = 0
+        snap = self.directory / "snapshot.json"
+        if snap.exists():
+            state = json.loads(snap.read_text())
+            last = snap_seq = state["seq"]
+            for account, balance, pin in state["accounts"]:
+                self._balances[account] = balance
+                self._pins[account] = _restore_pin(pin)
+        log = self.directory / "journal.log"
+        if log.exists():
+            good = 0
+            with open(log, "rb") as f:
+                for line in f:
+                    # a record is only acknowledged once its newline is on disk; a
+                    # last line without one is torn even if it parses, and keeping
+                    # it would glue the next append onto it
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entries = _decode(line)
+                    except (ValueError, TypeError):
+                        break  # torn write from a crash; nothing after it was acknowledged
+                    good += len(line)
+                    for e in entries:
+                        if e.seq <= snap_seq:
+                            continue  # crashed between writing a snapshot and emptying the log
+                        # entries carry the balance after the change, so replay is
+                        # idempotent and per-account file order is all that matters
+                        self._balances[e.account] = e.balance
+                        if e.kind in ("open", "pin"):
+                            self._pins[e.account] = _restore_pin(e.counterparty)
+                        last = max(last, e.seq)
+            with open(log, "r+b") as f:
+                f.truncate(good)
+        self._seq = itertools.count(last + 1)
+
+    def _seal_pin(self, pin):
+        return seal_pin(pin)
+
+    def _pin_matches(self, stored, pin) -> bool:
+        return pin_matches(stored, pin)
+
+    def _log(self, kind, account, amount, balance, counterparty=None):
+        entry = super()._log(kind, account, amount, balance, counterparty)
+        if kind == "transfer_out":
+            # held back so both legs go out as one record: a torn write can
+            # then never replay the debit without the credit
+            self._local.transfer_out = entry
+        elif kind == "transfer_in":
+            out, self._local.transfer_out = self._local.transfer_out, None
+            self._local.ticket = self.log.append(_encode([out, entry]))
+        else:
+            self._local.ticket = self.log.append(_encode(entry))
+        return entry
+
+    def _durable(self):
+        ticket = getattr(self._local, "ticket", 0)
+        if ticket:
+            self._local.ticket = 0
+            self.log.wait(ticket)
+        if self.log.records >= self.snapshot_every and self._snapshot_lock.acquire(blocking=False):
+            threading.Thread(target=self._background_snapshot, daemon=True).start()
+
+    def _background_snapshot(self):
+        try:
+            self._snapshot()
+        finally:
+            self._snapshot_lock.release()
+
+    def snapshot(self) -> int:
+        """Write a snapshot and empty the log; returns the sequence it covers."""
+        with self._snapshot_lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> int:
+        # stop-the-world: with every stripe held nothing new reaches the log
+        with self._all_stripes():
+            self.log.wait()
+            seq = next(self._seq)
+            self._seq = itertools.count(seq + 1)
+            state = {"seq": seq, "accounts": [[a, b, self._pins[a]] for a, b in self._balances.items()]}
+            tmp = self.directory / "snapshot.json.tmp"
+            with open(tmp, "w") as f:
+                json.dump(state, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.directory / "snapshot.json")
+            _fsync_dir(self.directory)
+            self.log.truncate()
+            # the journal is now redundant in memory too
+            self._journal.clear()
+        return seq
+
+    def close(self) -> None:
+        self.log.close()
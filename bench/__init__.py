@@ -0,0 +1 @@
+"""Benchmarks for the task_1 ATM ledger (run from the repository root)."""
@@ -0,0 +1,75 @@
+"""Compare per-transaction fsync with group commit at several batch windows.
+
+    python bench/durability_bench.py --threads 16 --seconds 5 --windows 0 0.5 2 5
+
+A window of 0 means every transaction writes and fsyncs on its own. Each run
+also reopens the ledger from disk and checks the recovered balances.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atm_store import DurableLedger
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run(window_ms: float, args) -> bool:
+    directory = tempfile.mkdtemp()
+    ledger = DurableLedger(directory, window_ms=window_ms)
+    ledger.open_accounts((a, 10000, "0000") for a in range(args.accounts))
+    stop = threading.Event()
+    latencies = []
+
+    def session(seed):
+        rnd = random.Random(seed)
+        mine = []
+        while not stop.is_set():
+            a, b = rnd.randrange(args.accounts), rnd.randrange(args.accounts)
+            t0 = time.perf_counter()
+            if rnd.random() < 0.5:
+                ledger.transfer(a, b, rnd.randint(1, 100))
+            else:
+                ledger.deposit(a, rnd.randint(1, 100))
+            mine.append((time.perf_counter() - t0) * 1000)
+        latencies.extend(mine)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    expected = {a: ledger.balance(a) for a in range(args.accounts)}
+    ledger.close()
+
+    recovered = DurableLedger(directory, window_ms=window_ms)
+    ok = all(recovered.balance(a) == b for a, b in expected.items())
+    recovered.close()
+    label = "per-tx fsync" if window_ms == 0 else f"group {window_ms:g} ms"
+    print(f"{label:<14} {len(latencies) / elapsed:>9,.0f} tx/s  p50={percentile(latencies, 50):7.2f} ms  "
+          f"p99={percentile(latencies, 99):7.2f} ms  recovery {'ok' if ok else 'MISMATCH'}")
+    return ok
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--accounts", type=int, default=10000)
+    ap.add_argument("--windows", type=float, nargs="+", default=[0, 0.5, 2, 5])
+    args = ap.parse_args()
+    ok = all([run(w, args) for w in args.windows])
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Hammer the ATM ledger from many threads and check money is conserved.
+
+    python bench/ledger_bench.py --accounts 1000000 --threads 8 --seconds 10
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atm_ledger import LOCK_STRIPES, Ledger
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--accounts", type=int, default=1000000)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--stripes", type=int, default=LOCK_STRIPES)
+    ap.add_argument("--transfer-share", type=float, default=0.5,
+                    help="fraction of operations that are transfers")
+    args = ap.parse_args()
+
+    ledger = Ledger(stripes=args.stripes, keep_journal=True)
+    t0 = time.perf_counter()
+    for account in range(args.accounts):
+        ledger.open_account(account, 10000, f"{account % 10000:04d}")
+    print(f"opened {args.accounts} accounts in {time.perf_counter() - t0:.1f}s")
+    start_total = ledger.total()
+
+    stop = threading.Event()
+    results = []
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        ops = ok = net = 0  # net: deposits minus withdrawals that went through
+        while not stop.is_set():
+            a = rnd.randrange(args.accounts)
+            amount = rnd.randint(1, 5000)
+            r = rnd.random()
+            if r < args.transfer_share:
+                ok += ledger.transfer(a, rnd.randrange(args.accounts), amount)
+            elif r < (1 + args.transfer_share) / 2:
+                if ledger.deposit(a, amount):
+                    ok += 1
+                    net += amount
+            elif ledger.withdraw(a, amount):
+                ok += 1
+                net -= amount
+            ops += 1
+        results.append((ops, ok, net))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    ops = sum(r[0] for r in results)
+    ok = sum(r[1] for r in results)
+    net = sum(r[2] for r in results)
+    end_total = ledger.total()
+    print(f"threads={args.threads} stripes={args.stripes}: {ops / elapsed:,.0f} tx/s "
+          f"({ok} applied, {ops - ok} declined)")
+    conserved = end_total == start_total + net
+    replayed = ledger.replay()
+    journal_ok = all(replayed[a] == ledger.balance(a) for a in replayed) and len(replayed) == len(ledger)
+    print(f"total {start_total} -> {end_total} (external net {net:+}): "
+          f"{'conserved' if conserved else 'NOT CONSERVED'}; journal replay "
+          f"{'matches' if journal_ok else 'DIFFERS'}")
+    return 0 if conserved and journal_ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
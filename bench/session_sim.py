@@ -0,0 +1,108 @@
+"""Replay generated ATM sessions across a process pool.
+
+    python bench/session_sim.py --sessions 1000000 --workers 4
+
+Every worker process holds its own in-memory Ledger and runs task_1.Session
+over randomly generated operation streams. It reports throughput and
+per-operation and per-session latency percentiles, from log2 histograms
+merged across workers.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atm_ledger import Ledger
+from task_1 import ATM, Session
+
+CHUNK = 10000
+BUCKETS = 40  # bucket i holds latencies in [2**i, 2**(i+1)) ns
+
+_ledger = None
+_accounts = 0
+
+def _init(accounts: int):
+    global _ledger, _accounts
+    _ledger, _accounts = Ledger(), accounts
+    _ledger.open_accounts((a, 10000, f"{a % 10000:04d}") for a in range(accounts))
+
+def generate(rnd: random.Random, account: int) -> list:
+    """One session: PIN entry (sometimes wrong first), 1-6 operations, exit."""
+    pin = f"{account % 10000:04d}"
+    ops = []
+    if rnd.random() < 0.1:
+        ops.append(("verify_pin", "xxxx"))
+    ops.append(("verify_pin", pin))
+    for _ in range(rnd.randint(1, 6)):
+        r = rnd.random()
+        if r < 0.4:
+            ops.append(("balance",))
+        elif r < 0.65:
+            ops.append(("deposit", rnd.randint(1, 5000)))
+        elif r < 0.95:
+            ops.append(("withdraw", rnd.randint(1, 5000)))
+        else:
+            ops.append(("change_pin", pin, pin))
+    ops.append(("exit",))
+    return ops
+
+def run_chunk(seed: int, n: int):
+    rnd = random.Random(seed)
+    op_hist, session_hist = [0] * BUCKETS, [0] * BUCKETS
+    ops = 0
+    clock = time.perf_counter_ns
+    for _ in range(n):
+        account = rnd.randrange(_accounts)
+        stream = generate(rnd, account)
+        session = Session(ATM(ledger=_ledger, account=account))
+        started = clock()
+        for op in stream:
+            t0 = clock()
+            session.process(op)
+            op_hist[min(BUCKETS - 1, (clock() - t0).bit_length())] += 1
+        session_hist[min(BUCKETS - 1, (clock() - started).bit_length())] += 1
+        ops += len(stream)
+    return ops, op_hist, session_hist
+
+def percentile_us(hist, pct) -> float:
+    """Upper edge of the bucket holding the pct-th percentile, in microseconds."""
+    target = sum(hist) * pct / 100
+    seen = 0
+    for i, count in enumerate(hist):
+        seen += count
+        if seen >= target:
+            return 2 ** i / 1000
+    return float("inf")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=1000000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--accounts", type=int, default=100000, help="accounts per worker")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    chunks = [CHUNK] * (args.sessions // CHUNK) + ([args.sessions % CHUNK] if args.sessions % CHUNK else [])
+    op_hist, session_hist = [0] * BUCKETS, [0] * BUCKETS
+    ops = 0
+    with ProcessPoolExecutor(args.workers, initializer=_init, initargs=(args.accounts,)) as pool:
+        started = time.perf_counter()
+        for n, oh, sh in pool.map(run_chunk, range(args.seed, args.seed + len(chunks)), chunks):
+            ops += n
+            op_hist = [a + b for a, b in zip(op_hist, oh)]
+            session_hist = [a + b for a, b in zip(session_hist, sh)]
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.sessions:,} sessions, {ops:,} operations on {args.workers} workers in {elapsed:.1f}s: "
+          f"{args.sessions / elapsed:,.0f} sessions/s, {ops / elapsed:,.0f} ops/s")
+    for label, hist in (("operation", op_hist), ("session", session_hist)):
+        print(f"{label:<10} latency us (<=): p50={percentile_us(hist, 50):g} "
+              f"p95={percentile_us(hist, 95):g} p99={percentile_us(hist, 99):g} "
+              f"p99.9={percentile_us(hist, 99.9):g}")
+
+if __name__ == "__main__":
+    main()
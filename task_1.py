@@ -1,54 +1,132 @@
+from pathlib import Path
+
+from atm_ledger import Ledger
+from atm_store import DurableLedger
+
+DATA_DIR = Path(__file__).with_name("atm_data")
+
 class ATM:
-    def __init__(self, initial_balance=10000, pin="1226"):
-        self.balance = initial_balance
-        self.pin = pin
+    """One account's view of a Ledger.
+
+    Without a ledger it opens a private single-account ledger, which keeps
+    the original ATM() behaviour. Sessions for different accounts share one
+    Ledger and each get their own ATM(ledger=..., account=...).
+    """
+
+    def __init__(self, initial_balance=10000, pin="1226", ledger=None, account=None):
+        if ledger is None:
+            ledger = Ledger(stripes=1)
+            account = "default" if account is None else account
+            ledger.open_account(account, initial_balance, pin)
+        self.ledger = ledger
+        self.account = account
+
+    @property
+    def balance(self):
+        return self.ledger.balance(self.account)
 
     def verify_pin(self, entered_pin):
-            return self.pin == entered_pin
+            return self.ledger.verify_pin(self.account, entered_pin)
 
     def check_balance(self):
         return self.balance
 
     def deposit(self, amount):
-        if amount > 0:
-            self.balance += amount
-            return True
-        return False
+        return self.ledger.deposit(self.account, amount)
 
     def withdraw(self, amount):
-        if amount > 0 and amount <= self.balance:
-            self.balance -= amount
-            return True
-        return False
+        return self.ledger.withdraw(self.account, amount)
+
+    def transfer(self, to_account, amount):
+        return self.ledger.transfer(self.account, to_account, amount)
     
-    def change_pin(self, pin):
-        pin=input("Please enter your old pin: ")
-        if self.pin==pin:
-            pin=input("Enter new pin: ")
-            self.pin = pin
-            return True
-        else:
-            print("Incorrect Pin")
-        return False
+    def change_pin(self, old_pin, new_pin):
+        return self.ledger.change_pin(self.account, old_pin, new_pin)
+
+class Session:
+    """Drives one ATM from a stream of operations, without any I/O.
+
+    Operations are tuples: ("verify_pin", pin), ("balance",), ("deposit", amount),
+    ("withdraw", amount), ("change_pin", old_pin, new_pin) and ("exit",).
+    process() returns (ok, value): the balance for balance/deposit/withdraw,
+    otherwise a message. Everything but verify_pin needs a verified PIN, and
+    the card is blocked after MAX_ATTEMPTS wrong PINs. A malformed operation
+    gets (False, "Invalid arguments ...") and the session carries on.
+    """
+
+    MAX_ATTEMPTS = 3
+    # operation -> argument count; amounts must be whole numbers
+    ARITY = {"verify_pin": 1, "balance": 0, "deposit": 1, "withdraw": 1, "change_pin": 2, "exit": 0}
+
+    def __init__(self, atm):
+        self.atm = atm
+        self.attempts = self.MAX_ATTEMPTS
+        self.verified = False
+        self.closed = False
+
+    def process(self, op):
+        if not isinstance(op, (tuple, list)) or not op:
+            return False, f"Invalid operation: {op!r}"
+        name, *args = op
+        if self.closed:
+            return False, "Session closed"
+        if not isinstance(name, str) or name not in self.ARITY:
+            return False, f"Unknown operation: {name}"
+        if len(args) != self.ARITY[name] or (
+                name in ("deposit", "withdraw") and type(args[0]) is not int):
+            return False, f"Invalid arguments for {name}: {tuple(args)!r}"
+        if name == "verify_pin":
+            if self.atm.verify_pin(*args):
+                self.verified = True
+                return True, "PIN accepted."
+            self.attempts -= 1
+            if self.attempts == 0:
+                self.closed = True
+                return False, "Too many incorrect attempts. Card blocked."
+            return False, f"Incorrect PIN. You have {self.attempts} attempts remaining."
+        if not self.verified:
+            return False, "PIN not verified"
+        match name:
+            case "balance":
+                return True, self.atm.check_balance()
+            case "deposit":
+                return self.atm.deposit(*args), self.atm.check_balance()
+            case "withdraw":
+                return self.atm.withdraw(*args), self.atm.check_balance()
+            case "change_pin":
+                if self.atm.change_pin(*args):
+                    return True, "Pin changed Sucessfully"
+                return False, "Incorrect Pin"
+            case "exit":
+                self.closed = True
+                return True, "Thank you for using the ATM."
+        return False, f"Unknown operation: {name}"
+
+    def run(self, ops):
+        """Process every operation in `ops`; returns the list of results."""
+        return [self.process(op) for op in ops]
+
+def open_atm(directory=DATA_DIR, account="default", initial_balance=10000, pin="1226"):
+    """ATM for `account` on the durable ledger in `directory`, opening the
+    account on first use."""
+    ledger = DurableLedger(directory)
+    if account not in ledger:
+        ledger.open_account(account, initial_balance, pin)
+    return ATM(ledger=ledger, account=account)
 
 def start():
-    atm = ATM()
-    attempts = 3
+    atm = open_atm()
+    session = Session(atm)
     print("Welcome!")
 
-    while attempts > 0:
-        entered_pin = input("Enter your 4-digit PIN: ")
-        if atm.verify_pin(entered_pin):
-            print("PIN accepted.")
-            break
-        else:
-            attempts -= 1
-            print(f"Incorrect PIN. You have {attempts} attempts remaining.")
-    else:
-        print("Too many incorrect attempts. Card blocked.")
-        return
-
-    while True:
+    while not session.verified:
+        ok, message = session.process(("verify_pin", input("Enter your 4-digit PIN: ")))
+        print(message)
+        if session.closed:
+            atm.ledger.close()
+            return
+
+    while not session.closed:
         print("\nATM Menu:")
         print("1. Check Balance")
         print("2. Deposit")
@@ -60,28 +138,35 @@ def start():
 
         match choice:
             case '1':
-                print(f"Your current balance is: ₹{atm.check_balance()}")
+                ok, balance = session.process(("balance",))
+                print(f"Your current balance is: ₹{balance}")
             case '2':
                 amount = int(input("Enter amount to deposit: ₹"))
-                if atm.deposit(amount):
-                    print(f"Successfully deposited ₹{amount}. Current balance: ₹{atm.check_balance()}")
+                ok, balance = session.process(("deposit", amount))
+                if ok:
+                    print(f"Successfully deposited ₹{amount}. Current balance: ₹{balance}")
                 else:
                     print("Invalid deposit amount. Please try again.")
             case '3':
                 amount = int(input("Enter amount to withdraw: ₹"))
-                if atm.withdraw(amount):
-                    print(f"Successfully withdrew ₹{amount}. Current balance: ₹{atm.check_balance()}")
+                ok, balance = session.process(("withdraw", amount))
+                if ok:
+                    print(f"Successfully withdrew ₹{amount}. Current balance: ₹{balance}")
                     print("Please collect your cash.")
                 else:
                     print("Insufficient funds or invalid withdrawal amount.")
             case '4':
-                if atm.change_pin(atm.pin):
-                    print("Pin changed Sucessfully")
-                else:
+                old_pin = input("Please enter your old pin: ")
+                new_pin = input("Enter new pin: ")
+                ok, message = session.process(("change_pin", old_pin, new_pin))
+                print(message)
+                if not ok:
                     print("Pin change is Unsuccessful")
             case '5':
-                print("Thank you for using the ATM.")
-                break
+                print(session.process(("exit",))[1])
             case _:
                 print("Please enter a valid number of your choice")
-start()
\ No newline at end of file
+    atm.ledger.close()
+
+if __name__ == "__main__":
+    start()